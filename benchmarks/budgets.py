@@ -0,0 +1,131 @@
+"""Show that budget evaluation costs the same on any size of ledger.
+
+For each ledger size the cases are:
+
+  rebuild              BudgetMonitor.rebuild(), the one query run at startup
+  insert_evaluate_x1000  1000 inserts fed to the monitor, each followed by
+                       alerts(), as the main screen does after every write
+  summary_scan         one get_summary_by_category() from the 1st to the 17th
+                       with a cold cache, what re-checking month-to-date
+                       budgets by query would cost
+
+`growth` divides each case's median at the largest size by its median at
+the smallest. Before timing anything, check_interleaved_write() makes
+sure a journaled insert reported after status() has already rebuilt from
+it is not counted twice.
+
+    python -m benchmarks.budgets --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from benchmarks.common import add_common_args, environment, finish, time_call
+from benchmarks.synthetic import default_categories, populate
+from budgets import BudgetMonitor
+from data_handler import TRANSACTION_COLUMNS, Change, FinanceDataHandler
+
+MONTH = "2020-06"
+EVALUATIONS = 1000
+
+
+def bench_ledger(size, workdir, repeat):
+    db_path = os.path.join(workdir, f"ledger-{size}.db")
+    handler = FinanceDataHandler(db_path)
+    populate(handler, size)
+    # Budgets from half to one and a half times each category's spend, so some alert
+    spent = handler.get_category_totals(MONTH)
+    expense_categories = [name for name, transaction_type in default_categories() if transaction_type == "expense"]
+    for i, category in enumerate(expense_categories):
+        handler.set_budget(category, max(spent.get(category, 0.0), 1.0) * (0.5 + i / len(expense_categories)))
+    monitor = BudgetMonitor(handler, month=MONTH)
+
+    changes = [Change("inserted", [size + i],
+                      [dict(zip(TRANSACTION_COLUMNS, (size + i, f"{MONTH}-15", 12.5,
+                                                      expense_categories[i % len(expense_categories)],
+                                                      "Benchmark", "expense")))])
+               for i in range(EVALUATIONS)]
+
+    def insert_and_evaluate():
+        for change in changes:
+            monitor.apply(change)
+            monitor.alerts()
+
+    cases = [
+        ("rebuild", monitor.rebuild, None),
+        (f"insert_evaluate_x{EVALUATIONS}", insert_and_evaluate, None),
+        ("summary_scan", lambda: handler.get_summary_by_category("expense", f"{MONTH}-01", f"{MONTH}-17"),
+         handler.summary_cache.clear),
+    ]
+    results = []
+    for name, fn, setup in cases:
+        fn()
+        results.append(dict(name=f"{size}/{name}", size=size, case=name, **time_call(fn, repeat, setup)))
+
+    handler.close()
+    os.remove(db_path)
+    return results
+
+
+def check_interleaved_write(workdir):
+    """Raise unless the monitor's totals survive a rebuild between a commit and its report"""
+    db_path = os.path.join(workdir, "interleaved.db")
+    handler = FinanceDataHandler(db_path, write_policy="immediate")
+    handler.set_budget("Groceries", 100.0)
+    monitor = BudgetMonitor(handler, month=MONTH)
+    committed, checked = threading.Event(), threading.Event()
+
+    def hold(change):
+        # Runs ahead of the monitor's listener, once the insert has committed
+        committed.set()
+        checked.wait(10)
+
+    handler.listeners.insert(0, hold)
+    writer = threading.Thread(target=handler.add_transaction,
+                              args=(f"{MONTH}-15", 30.0, "Groceries", "Benchmark", "expense"))
+    writer.start()
+    committed.wait(10)
+    monitor.status()
+    checked.set()
+    writer.join()
+    spent = {category: spent for category, spent, limit in monitor.status()}["Groceries"]
+    expected = handler.get_category_totals(MONTH).get("Groceries", 0.0)
+    handler.close()
+    os.remove(db_path)
+    if spent != expected:
+        raise RuntimeError(f"interleaved write: monitor has {spent} spent on Groceries, the ledger {expected}")
+
+
+def growth(cases):
+    """Median at the largest size over median at the smallest, per case"""
+    sizes = sorted({case["size"] for case in cases})
+    medians = {(case["size"], case["case"]): case["median_ms"] for case in cases}
+    return [
+        {"case": name, "from_size": sizes[0], "to_size": sizes[-1],
+         "growth": round(medians[sizes[-1], name] / medians[sizes[0], name], 2)}
+        for size, name in medians if size == sizes[0]
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark budget alert evaluation against ledger size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="ledger sizes to generate")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    results = {"benchmark": "budgets", "environment": environment(), "month": MONTH, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        check_interleaved_write(workdir)
+        for size in args.sizes:
+            print(f"Generating a {size:,}-row ledger and evaluating budgets...", file=sys.stderr)
+            results["cases"].extend(bench_ledger(size, workdir, args.repeat))
+    results["growth"] = growth(results["cases"])
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Compare chart render latency of the native pygame and matplotlib backends.
+
+Each chart type is rendered to a pygame surface the way the app's chart
+worker does it: the native backend draws straight onto a surface, while
+the matplotlib one builds a figure, rasterizes it with Agg and wraps the
+RGBA buffer. The summary cache is warm by default so the cases time
+rendering only; --cold clears it before every run to include the queries.
+
+    python -m benchmarks.charts --sizes 10000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from benchmarks.common import add_common_args, environment, finish, time_call
+from benchmarks.synthetic import populate
+from chart_worker import CHART_BACKENDS, CHART_TYPES
+from data_handler import FinanceDataHandler
+from pygame_charts import PygameChartRenderer
+from visualizer import FinanceVisualizer
+
+
+def renderers(handler):
+    visualizer = FinanceVisualizer(handler)
+    native = PygameChartRenderer(handler)
+
+    def matplotlib_surface(chart_type, year):
+        rgba, size = visualizer.fig_to_rgba(visualizer.build_chart(chart_type, year))
+        return pygame.image.frombuffer(rgba, size, "RGBA")
+
+    return {"native": native.build_chart, "matplotlib": matplotlib_surface}
+
+
+def bench_ledger(size, workdir, repeat, cold):
+    db_path = os.path.join(workdir, f"ledger-{size}.db")
+    handler = FinanceDataHandler(db_path)
+    populate(handler, size)
+    render = renderers(handler)
+    year = "2020"
+
+    setup = handler.summary_cache.clear if cold else None
+    cases = []
+    for chart_type in CHART_TYPES:
+        for backend in CHART_BACKENDS:
+            # Warm-up: imports, fonts and (unless cold) the summary cache
+            render[backend](chart_type, year)
+            stats = time_call(lambda: render[backend](chart_type, year), repeat, setup)
+            cases.append(dict(name=f"{size}/{backend}/{chart_type}", size=size, backend=backend,
+                              chart_type=chart_type, **stats))
+
+    handler.close()
+    os.remove(db_path)
+    return cases
+
+
+def speedups(cases):
+    """Median matplotlib latency over median native latency, per size and chart type"""
+    medians = {(case["size"], case["chart_type"], case["backend"]): case["median_ms"] for case in cases}
+    return [
+        {"size": size, "chart_type": chart_type,
+         "speedup": round(medians[size, chart_type, "matplotlib"] / medians[size, chart_type, "native"], 2)}
+        for size, chart_type, backend in medians if backend == "native"
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the native and matplotlib chart backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="ledger sizes to generate")
+    parser.add_argument("--repeat", type=int, default=10, help="timed renders per case")
+    parser.add_argument("--cold", action="store_true", help="clear the summary cache before every render")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    pygame.font.init()
+    results = {"benchmark": "charts", "environment": environment(), "cold": args.cold, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        for size in args.sizes:
+            print(f"Generating and rendering charts for a {size:,}-row ledger...", file=sys.stderr)
+            results["cases"].extend(bench_ledger(size, workdir, args.repeat, args.cold))
+    results["speedups"] = speedups(results["cases"])
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Timing, JSON output and baseline comparison shared by the benchmarks"""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+
+DEFAULT_TOLERANCE = 0.25
+# Sub-millisecond cases jitter by more than the tolerance between runs
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def time_call(fn, repeat=5, setup=None):
+    """Run fn `repeat` times and return latency stats in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    """Latency stats for a list of millisecond samples"""
+    samples = sorted(samples)
+    return {
+        "repeat": len(samples),
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def write_results(results, path=None):
+    text = json.dumps(results, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+def load_baseline(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def add_common_args(parser, baseline=None):
+    """Options every benchmark takes for output, baselines and temporary files"""
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", default=baseline, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a case counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--workdir", help="directory for temporary databases and files")
+
+
+def finish(results, args):
+    """Compare with the baseline, write the results and report regressions; the exit status"""
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline:
+        results["comparison"] = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    write_results(results, args.output)
+    if args.save_baseline:
+        write_results(results, args.save_baseline)
+
+    comparison = results.get("comparison", [])
+    for entry in comparison:
+        if entry["baseline_ms"] is None:
+            print(f"NO BASELINE {entry['case']}: {entry['current_ms']:.3f} ms", file=sys.stderr)
+    regressions = [entry for entry in comparison if entry["regression"]]
+    for entry in regressions:
+        print(f"REGRESSION {entry['case']}: {entry['baseline_ms']:.3f} ms -> {entry['current_ms']:.3f} ms "
+              f"({entry['ratio']:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """Compare median latencies with a baseline of the same shape.
+
+    A case regresses when it is slower by more than `tolerance` and by at
+    least `min_delta_ms` in absolute terms.
+
+    Returns a list of {"case", "baseline_ms", "current_ms", "ratio",
+    "regression"} dicts for every case in `results`; a case the baseline
+    does not have gets None for baseline_ms and ratio and never regresses.
+    """
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    report = []
+    for case in results["cases"]:
+        old = previous.get(case["name"])
+        if not old:
+            report.append({"case": case["name"], "baseline_ms": None, "current_ms": case["median_ms"],
+                           "ratio": None, "regression": False})
+            continue
+        old_ms, new_ms = old["median_ms"], case["median_ms"]
+        ratio = new_ms / old_ms if old_ms else float("inf")
+        report.append({
+            "case": case["name"],
+            "baseline_ms": old_ms,
+            "current_ms": new_ms,
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + tolerance and new_ms - old_ms >= min_delta_ms,
+        })
+    return report
@@ -0,0 +1,110 @@
+"""Headless benchmarks for FinanceDataHandler and the chart builders.
+
+Each ledger size is generated into a temporary SQLite file, then the hot
+data-layer calls and the FinanceVisualizer charts (Agg backend) are
+timed. Results are printed or written as JSON and, given a baseline,
+compared case by case; the exit status is 1 when any median latency
+regressed by more than the tolerance.
+
+    python -m benchmarks.data_layer --sizes 10000 1000000
+    python -m benchmarks.data_layer --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_common_args, environment, finish, time_call
+from benchmarks.synthetic import populate
+from data_handler import FinanceDataHandler
+from visualizer import FinanceVisualizer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# get_all_transactions builds one DataFrame of the whole ledger; past this
+# size it measures swap more than the handler
+FULL_TABLE_LIMIT = 2_000_000
+
+
+def bench_ledger(size, workdir, repeat, skip):
+    db_path = os.path.join(workdir, f"ledger-{size}.db")
+    handler = FinanceDataHandler(db_path)
+    start = time.perf_counter()
+    populate(handler, size)
+    generate_seconds = time.perf_counter() - start
+    visualizer = FinanceVisualizer(handler)
+    year = "2020"
+
+    def uncached():
+        # Measure the queries, not the summary cache in front of them
+        handler.summary_cache.clear()
+
+    cases = {}
+
+    def run(name, fn, repeat=repeat, setup=uncached):
+        if name in skip:
+            return
+        cases[name] = time_call(fn, repeat, setup)
+
+    inserted = []
+
+    def add_transaction():
+        inserted.append(handler.add_transaction("2020-06-15", 12.5, "Groceries", "benchmark", "expense"))
+
+    run("add_transaction", add_transaction, repeat=max(repeat, 20))
+    if size <= FULL_TABLE_LIMIT:
+        run("get_all_transactions", handler.get_all_transactions, repeat=min(repeat, 3))
+    run("get_summary_by_category", lambda: handler.get_summary_by_category("expense"))
+    run("get_summary_by_category_range",
+        lambda: handler.get_summary_by_category("expense", "2019-03-15", "2021-09-10"))
+    run("get_monthly_summary", lambda: handler.get_monthly_summary(year))
+    run("get_transactions_page", lambda: handler.get_transactions_page(10, after=("2020-01-01", 0)))
+    run("get_time_series_month", lambda: handler.get_time_series(granularity="month"))
+    run("get_time_series_day_range", lambda: handler.get_time_series("2019-03-15", "2021-09-10", "day"))
+    if size <= FULL_TABLE_LIMIT:
+        run("load_store", handler.load_store, repeat=min(repeat, 3))
+        store = handler.load_store()
+        run("store_filter", lambda: store.filter(start_date="2019-03-15", end_date="2021-09-10",
+                                                 transaction_types=["expense"]))
+        run("store_sum_by_month_category", lambda: store.sum_by("month", "category"))
+        run("store_sort", lambda: store.sort(descending=True))
+    run("export_to_csv", lambda: handler.export_to_csv(os.path.join(workdir, "export.csv")),
+        repeat=min(repeat, 3))
+    if inserted:
+        run("delete_transaction", lambda: handler.delete_transaction(inserted.pop()), repeat=len(inserted),
+            setup=None)
+
+    for chart_type in ("pie_expense", "monthly_summary", "balance_over_time", "financial_flow"):
+        def render(chart_type=chart_type):
+            fig = visualizer.build_chart(chart_type, year)
+            visualizer.fig_to_rgba(fig)
+        run(f"chart_{chart_type}", render)
+
+    handler.close()
+    os.remove(db_path)
+    return generate_seconds, [dict(name=f"{size}/{name}", size=size, **stats) for name, stats in cases.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the finance data layer on synthetic ledgers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000],
+                        help="ledger sizes to generate (e.g. 10000 1000000 10000000)")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per case")
+    parser.add_argument("--skip", nargs="*", default=[], help="case names to skip")
+    add_common_args(parser, baseline=DEFAULT_BASELINE)
+    args = parser.parse_args(argv)
+
+    results = {"benchmark": "data_layer", "environment": environment(), "ledgers": [], "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        for size in args.sizes:
+            print(f"Generating and benchmarking a {size:,}-row ledger...", file=sys.stderr)
+            generate_seconds, cases = bench_ledger(size, workdir, args.repeat, set(args.skip))
+            results["ledgers"].append({"size": size, "generate_seconds": round(generate_seconds, 3)})
+            results["cases"].extend(cases)
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Measure CPU used by the app while it sits idle on each screen.
+
+Runs the real main loop headless (SDL dummy video driver) against a
+throwaway database and reports CPU seconds per wall-clock second, with
+the idle wait enabled, with continuous polling, and with polling plus
+full-screen repaints (the loop before dirty rects) for comparison.
+SDL's dummy driver cannot block in SDL_WaitEvent and polls every
+millisecond instead, so idle_wait figures here are an upper bound; the
+frame rates show how much work the loop actually does. Each case's
+latency stats are CPU milliseconds per wall-clock second over --repeat
+runs, so the baseline comparison flags a loop that got busier.
+
+    python -m benchmarks.idle_cpu --seconds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from benchmarks.common import add_common_args, environment, finish, summarize
+import main as app_module
+
+
+MODES = {
+    "idle_wait": dict(idle_wait=True, dirty_rects=True),
+    "polling": dict(idle_wait=False, dirty_rects=True),
+    "polling_full_redraw": dict(idle_wait=False, dirty_rects=False),
+}
+
+
+def measure(screen, mode, seconds, max_fps, db_path):
+    """(CPU seconds, wall seconds, frames presented) for one idle run"""
+    options = MODES[mode]
+    app = app_module.FinanceTrackerApp(max_fps=max_fps, idle_wait=options["idle_wait"], db_path=db_path)
+    app.dirty_rect_updates = options["dirty_rects"]
+    app.current_screen = screen
+    frames = 0
+    present = app.present
+
+    def counting_present():
+        nonlocal frames
+        frames += 1
+        present()
+
+    app.present = counting_present
+    threading.Timer(seconds, pygame.event.post, [pygame.event.Event(pygame.QUIT)]).start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    try:
+        app.run()
+    except SystemExit:
+        pass
+    return time.process_time() - cpu_start, time.perf_counter() - wall_start, frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="idle time measured per run")
+    parser.add_argument("--max-fps", type=int, default=60)
+    parser.add_argument("--screens", nargs="+", default=["main", "view_transactions", "charts"])
+    parser.add_argument("--repeat", type=int, default=1, help="idle runs per screen and mode")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    results = {"benchmark": "idle_cpu", "environment": environment(), "seconds": args.seconds,
+               "max_fps": args.max_fps, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        db_path = os.path.join(workdir, "finance.db")
+        for screen in args.screens:
+            for mode in MODES:
+                runs = []
+                for _ in range(args.repeat):
+                    pygame.init()
+                    runs.append(measure(screen, mode, args.seconds, args.max_fps, db_path))
+                cpu_ms = [1000 * cpu / wall for cpu, wall, frames in runs]
+                results["cases"].append(dict(
+                    name=f"{screen}/{mode}", screen=screen, mode=mode,
+                    cpu_percent=round(statistics.median(cpu_ms) / 10, 2),
+                    frames_per_second=round(statistics.median(frames / wall for cpu, wall, frames in runs), 1),
+                    **summarize(cpu_ms)))
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
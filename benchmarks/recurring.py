@@ -0,0 +1,99 @@
+"""Measure catching up on recurring transactions after the app was closed for a while.
+
+Each gap gets a ledger seeded with --existing rows and the rules in RULES,
+all starting `gap` days before today and never written. The cases are:
+
+  catch_up    materialize_recurring(), one executemany and one commit for
+              every occurrence due
+  row_by_row  the same occurrences through add_transaction() on a handler
+              without a journal, one commit each, as a naive scheduler would
+  projection  get_projected_transactions() for the coming year, which
+              writes nothing
+
+Both writing cases start from the same unwritten state on every run.
+
+    python -m benchmarks.recurring --gaps 30 365 1825
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from benchmarks.common import add_common_args, environment, finish, time_call
+from benchmarks.synthetic import populate
+from data_handler import FinanceDataHandler
+from recurring import occurrences
+
+DESCRIPTION = "Recurring benchmark"
+# (amount, category, transaction_type, frequency, interval)
+RULES = [
+    (4.5, "Groceries", "expense", "daily", 1),
+    (60.0, "Transportation", "expense", "weekly", 1),
+    (1400.0, "Rent", "expense", "monthly", 1),
+    (2500.0, "Salary", "income", "monthly", 1),
+    (300.0, "Savings", "saving", "weekly", 2),
+]
+
+
+def bench_gap(gap, workdir, existing, repeat):
+    db_path = os.path.join(workdir, f"recurring-{gap}.db")
+    handler = FinanceDataHandler(db_path)
+    populate(handler, existing)
+    today = date.today().isoformat()
+    start_date = (date.today() - timedelta(days=gap)).isoformat()
+    for amount, category, transaction_type, frequency, interval in RULES:
+        handler.add_recurring_rule(amount, category, DESCRIPTION, transaction_type, start_date, frequency, interval)
+    due = sorted((day, amount, category, DESCRIPTION, transaction_type)
+                 for amount, category, transaction_type, frequency, interval in RULES
+                 for day in occurrences(start_date, frequency, interval, through=today))
+
+    def reset():
+        with handler.conn as conn:
+            conn.execute("DELETE FROM transactions WHERE description = ?", (DESCRIPTION,))
+            conn.execute("UPDATE recurring_rules SET materialized_until = NULL")
+        handler.recurring_through = None
+
+    def row_by_row():
+        for row in due:
+            handler.add_transaction(*row)
+
+    next_year = (date.today() + timedelta(days=365)).isoformat()
+    cases = [
+        ("catch_up", handler.materialize_recurring, reset),
+        ("row_by_row", row_by_row, reset),
+        ("projection", lambda: handler.get_projected_transactions(None, next_year), None),
+    ]
+    results = []
+    for name, fn, setup in cases:
+        results.append(dict(name=f"{gap}/{name}", gap_days=gap, occurrences=len(due), case=name,
+                            **time_call(fn, repeat, setup)))
+
+    written = handler.conn.execute("SELECT COUNT(*) FROM transactions WHERE description = ?",
+                                   (DESCRIPTION,)).fetchone()[0]
+    handler.close()
+    os.remove(db_path)
+    if written != len(due):
+        raise RuntimeError(f"gap {gap}: expected {len(due)} occurrences, found {written}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recurring transaction catch-up against gap length")
+    parser.add_argument("--gaps", type=int, nargs="+", default=[30, 365], help="days since the rules started")
+    parser.add_argument("--existing", type=int, default=10_000, help="rows in the ledger before catching up")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    results = {"benchmark": "recurring", "environment": environment(), "existing": args.existing, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        for gap in args.gaps:
+            print(f"Catching up on {gap} days of recurring transactions...", file=sys.stderr)
+            results["cases"].extend(bench_gap(gap, workdir, args.existing, args.repeat))
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
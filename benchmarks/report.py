@@ -0,0 +1,68 @@
+"""Measure how report generation scales with worker processes.
+
+A synthetic ledger covering 2015-2025 is rendered by
+report.generate_report() for --years, every chart type, once per worker
+count in --workers. Each case is the wall-clock time of a whole report,
+pool start-up included. `scaling` gives each worker count's speedup over
+the smallest count and its efficiency (speedup per added worker); close
+to 1.0 is linear.
+
+    python -m benchmarks.report --size 100000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.common import add_common_args, environment, finish, time_call
+from benchmarks.synthetic import populate
+from data_handler import FinanceDataHandler
+from report import ReportPeriod, generate_report
+
+
+def scaling(cases):
+    """Speedup and efficiency of each worker count against the smallest"""
+    base = min(cases, key=lambda case: case["workers"])
+    return [
+        {"workers": case["workers"],
+         "speedup": round(base["median_ms"] / case["median_ms"], 2),
+         "efficiency": round(base["median_ms"] / case["median_ms"] * base["workers"] / case["workers"], 2)}
+        for case in cases
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark report generation against worker count")
+    parser.add_argument("--size", type=int, default=100_000, help="ledger size to generate")
+    parser.add_argument("--years", nargs="+", default=[str(year) for year in range(2015, 2026)],
+                        help="years in the report")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}),
+                        help="worker counts to run")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png", help="file format to render")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per worker count")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    periods = [ReportPeriod.parse(year) for year in args.years]
+    results = {"benchmark": "report", "environment": environment(), "cpu_count": os.cpu_count(),
+               "size": args.size, "years": args.years, "format": args.format, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        db_path = os.path.join(workdir, "ledger.db")
+        print(f"Generating a {args.size:,}-row ledger...", file=sys.stderr)
+        with FinanceDataHandler(db_path) as handler:
+            populate(handler, args.size)
+        chart_dir = os.path.join(workdir, "charts")
+        for workers in sorted(args.workers):
+            print(f"Rendering {len(periods)} years with {workers} workers...", file=sys.stderr)
+            stats = time_call(lambda: generate_report(db_path, periods, chart_dir, formats=[args.format],
+                                                      workers=workers),
+                              args.repeat, lambda: shutil.rmtree(chart_dir, ignore_errors=True))
+            results["cases"].append(dict(name=f"workers_{workers}", workers=workers, **stats))
+    results["scaling"] = scaling(results["cases"])
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
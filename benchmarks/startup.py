@@ -0,0 +1,97 @@
+"""Measure how long the app takes to put its main menu on screen.
+
+Each run starts a fresh interpreter (SDL dummy video driver) against a
+throwaway database and records the time from process launch to the end
+of the first presented frame, split into importing main, constructing
+FinanceTrackerApp and drawing the frame. It also reports which of the
+heavy modules were already loaded by then; matplotlib and pandas should
+only arrive once the chart worker starts after that frame.
+
+    python -m benchmarks.startup --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_common_args, environment, finish, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["matplotlib", "pandas", "numpy"]
+PHASES = ["time_to_first_frame", "import", "init", "first_frame"]
+
+# Runs in the child process; prints one JSON line once the first frame is up
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.FinanceTrackerApp(db_path=sys.argv[1])
+constructed = time.perf_counter()
+present = app.present
+
+def first_present():
+    present()
+    presented = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "init_ms": (constructed - imported) * 1000,
+        "first_frame_ms": (presented - constructed) * 1000,
+        "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+    }), flush=True)
+    app.shutdown()
+
+app.present = first_present
+app.run()
+"""
+
+
+def launch(db_path):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", CHILD, db_path, json.dumps(HEAVY_MODULES)],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env,
+                               cwd=os.path.dirname(db_path))
+    # The app prints status lines too; the report is the JSON one
+    for line in process.stdout:
+        if line.startswith("{"):
+            elapsed = (time.perf_counter() - start) * 1000
+            break
+    else:
+        raise RuntimeError(f"app exited with status {process.wait()} before its first frame")
+    process.stdout.read()
+    process.wait()
+    return dict(json.loads(line), time_to_first_frame_ms=elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark time to the first frame of the app")
+    parser.add_argument("--repeat", type=int, default=10, help="app launches to time")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        db_path = os.path.join(workdir, "finance.db")
+        # The first launch creates the database; time the steady state after it
+        launch(db_path)
+        for _ in range(args.repeat):
+            runs.append(launch(db_path))
+
+    cases = [dict(name=phase, **summarize([run[phase + "_ms"] for run in runs])) for phase in PHASES]
+    results = {
+        "benchmark": "startup",
+        "environment": environment(),
+        "cases": cases,
+        "loaded_at_first_frame": sorted({name for run in runs for name in run["loaded"]}),
+    }
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Synthetic ledgers with realistic date, category and type distributions"""
+import math
+import random
+from datetime import date, timedelta
+
+# (category, type, weight, typical amount, spread) -- amounts are log-normal
+CATEGORY_PROFILES = [
+    ("Groceries", "expense", 30, 60.0, 0.6),
+    ("Entertainment", "expense", 14, 35.0, 0.8),
+    ("Transportation", "expense", 16, 25.0, 0.7),
+    ("Utilities", "expense", 6, 120.0, 0.4),
+    ("Rent", "expense", 3, 1400.0, 0.1),
+    ("Freelance", "income", 4, 600.0, 0.7),
+    ("Salary", "income", 3, 4200.0, 0.05),
+    ("Savings", "saving", 3, 300.0, 0.5),
+    ("Investment", "saving", 2, 500.0, 0.8),
+]
+
+MERCHANTS = {
+    "Groceries": ["Whole Foods", "Trader Joe's", "Safeway", "Costco", "Local market"],
+    "Entertainment": ["Netflix", "Cinema", "Spotify", "Concert tickets", "Steam"],
+    "Transportation": ["Uber", "Shell", "Metro card", "Parking", "Lyft"],
+    "Utilities": ["Electric bill", "Water bill", "Internet", "Phone plan"],
+    "Rent": ["Monthly rent"],
+    "Freelance": ["Client invoice", "Consulting", "Upwork payout"],
+    "Salary": ["ACME payroll"],
+    "Savings": ["Emergency fund transfer", "Vacation fund"],
+    "Investment": ["Index fund", "Brokerage deposit", "Retirement contribution"],
+}
+
+
+def default_categories():
+    return [(name, transaction_type) for name, transaction_type, *_ in CATEGORY_PROFILES]
+
+
+def generate_ledger(count, start=date(2015, 1, 1), end=date(2025, 12, 31), seed=42):
+    """Yield `count` (date, amount, category, description, transaction_type) rows.
+
+    Dates are uniform over [start, end] with a weekend bump for spending;
+    rows are yielded in random date order, as a year of imports would be.
+    """
+    rng = random.Random(seed)
+    days = (end - start).days + 1
+    names = [profile[0] for profile in CATEGORY_PROFILES]
+    weights = [profile[2] for profile in CATEGORY_PROFILES]
+    profiles = {profile[0]: profile for profile in CATEGORY_PROFILES}
+    for category in rng.choices(names, weights, k=count):
+        _, transaction_type, _, typical, spread = profiles[category]
+        day = start + timedelta(days=rng.randrange(days))
+        if transaction_type == "expense" and day.weekday() < 5 and rng.random() < 0.2:
+            day += timedelta(days=5 - day.weekday())
+            if day > end:
+                day = end
+        amount = round(rng.lognormvariate(math.log(typical), spread), 2)
+        description = rng.choice(MERCHANTS[category])
+        yield day.isoformat(), amount, category, description, transaction_type
+
+
+def populate(handler, count, seed=42, batch_size=50000):
+    """Fill an empty database with the default categories and a synthetic ledger"""
+    handler.conn.executemany("INSERT INTO categories (name, type) VALUES (?, ?)", default_categories())
+    handler.conn.commit()
+    return handler.import_transactions(generate_ledger(count, seed=seed), batch_size=batch_size)
@@ -0,0 +1,86 @@
+"""Measure sustained insert throughput under each write-journal durability policy.
+
+Each policy gets a fresh ledger seeded with --existing rows (so the
+rollup and search triggers work against realistic indexes), then takes
+--inserts back-to-back add_transaction() calls and a final flush. The
+"synchronous" case is the handler without a journal, committing every
+insert in place. Latency stats are for the add_transaction() call as the
+caller sees it; inserts_per_sec includes the closing flush.
+
+    python -m benchmarks.write_journal --inserts 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_common_args, environment, finish, summarize
+from benchmarks.synthetic import generate_ledger, populate
+from data_handler import FinanceDataHandler
+
+# Case name -> write_policy passed to the handler
+POLICIES = {
+    "synchronous": None,
+    "immediate": "immediate",
+    "10ms": "10ms",
+    "50ms": "50ms",
+    "100ops": "100ops",
+    "50ms,256ops": "50ms,256ops",
+}
+
+
+def bench_policy(name, workdir, existing, inserts):
+    db_path = os.path.join(workdir, f"journal-{name}.db")
+    with FinanceDataHandler(db_path) as handler:
+        populate(handler, existing)
+    rows = list(generate_ledger(inserts, seed=7))
+
+    handler = FinanceDataHandler(db_path, write_policy=POLICIES[name])
+    commits = 0
+    if handler.journal is not None:
+        def count_commit(ops):
+            nonlocal commits
+            commits += 1
+        handler.journal.on_commit = count_commit
+    else:
+        commits = inserts
+
+    samples = []
+    start = time.perf_counter()
+    for row in rows:
+        call_start = time.perf_counter()
+        handler.add_transaction(*row)
+        samples.append((time.perf_counter() - call_start) * 1000)
+    handler.flush()
+    elapsed = time.perf_counter() - start
+
+    stored = handler.count_transactions()
+    handler.close()
+    os.remove(db_path)
+    if stored != existing + inserts:
+        raise RuntimeError(f"{name}: expected {existing + inserts} rows, found {stored}")
+    return dict(name=f"{inserts}/{name}", policy=name, inserts=inserts, commits=commits,
+                inserts_per_sec=round(inserts / elapsed), **summarize(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark insert throughput under each write policy")
+    parser.add_argument("--inserts", type=int, default=2000, help="inserts per policy")
+    parser.add_argument("--existing", type=int, default=10_000, help="rows in the ledger before inserting")
+    parser.add_argument("--policies", nargs="+", choices=list(POLICIES), default=list(POLICIES),
+                        help="policies to run (default: all)")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    results = {"benchmark": "write_journal", "environment": environment(), "existing": args.existing, "cases": []}
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="finance-bench-") as workdir:
+        for name in args.policies:
+            print(f"Inserting {args.inserts:,} rows with the {name} policy...", file=sys.stderr)
+            results["cases"].append(bench_policy(name, workdir, args.existing, args.inserts))
+
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import threading
+from datetime import date
+
+# Fractions of a monthly budget at which spending raises an alert
+ALERT_THRESHOLDS = (0.8, 1.0)
+
+
+class BudgetMonitor:
+    """Month-to-date spending per category, checked against monthly budgets.
+
+    rebuild() reads the month's expense totals from the monthly rollup in
+    one query. After that every insert, delete or restore the handler
+    commits on the monitor's own thread moves a single running total, so
+    checking budgets costs the same on any size of ledger. Updates are
+    reported without their old values, and imports without any rows, so
+    those mark the totals for a rebuild on next use instead. So does a
+    change committed on another connection, a journaled write or one from
+    another thread, since status() may already have rebuilt from it by
+    the time apply() hears of it. Those commits move the database's
+    data_version, like the writes the handler never reports (the CLI,
+    another process), and status() checks it before answering. Use the
+    monitor from the thread that created it, as data_version is per
+    connection.
+    """
+
+    def __init__(self, data_handler, thresholds=ALERT_THRESHOLDS, month=None):
+        self.data_handler = data_handler
+        self.thresholds = sorted(thresholds)
+        # A fixed 'YYYY-MM' month, or None to follow the calendar
+        self.fixed_month = month
+        self.month = None
+        self.budgets = {}
+        self.totals = {}
+        self.stale = True
+        self.data_version = None
+        self.thread_id = threading.get_ident()
+        # Journaled writes are reported from the journal's writer thread
+        self.lock = threading.Lock()
+        data_handler.add_listener(self.apply)
+        self.rebuild()
+
+    def current_month(self):
+        return self.fixed_month or date.today().strftime('%Y-%m')
+
+    def rebuild(self):
+        month = self.current_month()
+        # Read before the queries: a commit landing in between moves it
+        # again, so the next status() rebuilds instead of trusting totals
+        # that may have counted the change twice
+        data_version = self.data_handler.data_version()
+        # Query outside the lock: reading flushes the write journal, whose
+        # writer reports the flushed writes to apply() before the query runs
+        budgets = self.data_handler.get_budgets()
+        totals = self.data_handler.get_category_totals(month)
+        with self.lock:
+            self.month, self.budgets, self.totals, self.stale = month, budgets, totals, False
+            self.data_version = data_version
+
+    def apply(self, change):
+        """Handler listener: move the running totals by one committed change"""
+        with self.lock:
+            if (change.kind in ("updated", "reset") or self.data_handler.journal is not None
+                    or threading.get_ident() != self.thread_id):
+                self.stale = True
+                return
+            sign = 1 if change.kind == "inserted" else -1
+            for row in change.rows:
+                if row['transaction_type'] == 'expense' and row['date'][:7] == self.month:
+                    self.totals[row['category']] = self.totals.get(row['category'], 0.0) + sign * row['amount']
+
+    def set_budget(self, category, monthly_limit):
+        self.data_handler.set_budget(category, monthly_limit)
+        with self.lock:
+            self.budgets[category] = monthly_limit
+
+    def remove_budget(self, category):
+        removed = self.data_handler.remove_budget(category)
+        with self.lock:
+            self.budgets.pop(category, None)
+        return removed
+
+    def status(self):
+        """(category, spent, limit) for every budget, this month"""
+        if (self.stale or self.current_month() != self.month
+                or self.data_handler.data_version() != self.data_version):
+            self.rebuild()
+        with self.lock:
+            return sorted((category, self.totals.get(category, 0.0), limit)
+                          for category, limit in self.budgets.items())
+
+    def alerts(self):
+        """(category, spent, limit, threshold) for each budget past a threshold, fullest first"""
+        alerts = []
+        for category, spent, limit in self.status():
+            crossed = [threshold for threshold in self.thresholds if spent >= threshold * limit]
+            if crossed:
+                alerts.append((category, spent, limit, crossed[-1]))
+        alerts.sort(key=lambda alert: alert[1] / alert[2], reverse=True)
+        return alerts
@@ -0,0 +1,121 @@
+import pygame
+
+# Zoom factors the +/- keys step through, relative to a chart's normal size
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+
+class ChartViewport:
+    """Zoom and drag-pan over a chart that was rasterized once at high resolution.
+
+    Charts arrive `resolution` times their normal size. Each zoom level is
+    scaled down from the nearest larger level already built (mipmap-style)
+    the first time it is shown and kept until the next chart arrives, so
+    zooming and panning only ever blit.
+    """
+
+    def __init__(self, rect, resolution=2.0):
+        self.rect = pygame.Rect(rect)
+        self.resolution = resolution
+        self.chart = None
+        self.levels = {}
+        self.zoom_index = ZOOM_LEVELS.index(1.0)
+        # Chart position relative to where it sits unpanned: centered at the top
+        self.offset = [0, 0]
+        self.dragging = False
+
+    @property
+    def zoom(self):
+        return ZOOM_LEVELS[self.zoom_index]
+
+    def set_chart(self, surface):
+        if surface is self.chart:
+            return
+        self.chart = surface
+        self.levels = {}
+        self.offset = [0, 0]
+        self.dragging = False
+
+    def level_size(self, zoom):
+        width, height = self.chart.get_size()
+        return round(width * zoom / self.resolution), round(height * zoom / self.resolution)
+
+    def level(self, zoom=None):
+        """The chart at `zoom` (the current zoom by default)"""
+        zoom = self.zoom if zoom is None else zoom
+        surface = self.levels.get(zoom)
+        if surface is None:
+            larger = [built for built in self.levels if built > zoom]
+            source = self.levels[min(larger)] if larger else self.chart
+            size = self.level_size(zoom)
+            surface = source if source.get_size() == size else pygame.transform.smoothscale(source, size)
+            self.levels[zoom] = surface
+        return surface
+
+    def chart_rect(self, zoom=None):
+        """Where the chart at `zoom` sits on screen"""
+        rect = pygame.Rect((0, 0), self.level_size(self.zoom if zoom is None else zoom))
+        rect.midtop = (self.rect.centerx + self.offset[0], self.rect.top + self.offset[1])
+        return rect
+
+    def clamp_offset(self):
+        # A chart smaller than the viewport stays put; a larger one can move
+        # until its edge meets the viewport's
+        rect = self.chart_rect()
+        for axis, (start, size, view_start, view_size) in enumerate(
+                ((rect.left, rect.width, self.rect.left, self.rect.width),
+                 (rect.top, rect.height, self.rect.top, self.rect.height))):
+            if size <= view_size:
+                self.offset[axis] = 0
+            else:
+                self.offset[axis] += min(view_start - start, 0) or max(view_start + view_size - (start + size), 0)
+        return rect
+
+    def zoom_by(self, steps):
+        """Move `steps` zoom levels in or out around the viewport's center; False at either end"""
+        index = max(0, min(len(ZOOM_LEVELS) - 1, self.zoom_index + steps))
+        if index == self.zoom_index:
+            return False
+        if self.chart is not None:
+            # Keep the part of the chart under the viewport's center in place
+            before = self.chart_rect()
+            ratio = ZOOM_LEVELS[index] / self.zoom
+            center_x, center_y = self.rect.centerx, self.rect.centery
+            left = center_x - (center_x - before.left) * ratio
+            top = center_y - (center_y - before.top) * ratio
+            after = self.chart_rect(ZOOM_LEVELS[index])
+            self.offset = [self.offset[0] + round(left - after.left), self.offset[1] + round(top - after.top)]
+        self.zoom_index = index
+        if self.chart is not None:
+            self.clamp_offset()
+        return True
+
+    def pan(self, dx, dy):
+        before = list(self.offset)
+        self.offset[0] += dx
+        self.offset[1] += dy
+        self.clamp_offset()
+        return self.offset != before
+
+    def handle_event(self, event):
+        """Pan with left-button drags that start over the chart; True when the view moved"""
+        if self.chart is None:
+            return False
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.dragging = self.chart_rect().clip(self.rect).collidepoint(event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.dragging = False
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            return self.pan(*event.rel)
+        return False
+
+    def draw(self, screen, clip_rects=None):
+        """Blit the chart, limited to the viewport and, if given, to clip_rects"""
+        if self.chart is None:
+            return
+        surface = self.level()
+        position = self.chart_rect().topleft
+        previous_clip = screen.get_clip()
+        for clip in [self.rect] if clip_rects is None else [rect.clip(self.rect) for rect in clip_rects]:
+            screen.set_clip(clip)
+            screen.blit(surface, position)
+        screen.set_clip(previous_clip)
@@ -0,0 +1,130 @@
+import threading
+
+from data_handler import FinanceDataHandler
+
+CHART_TYPES = ["pie_expense", "pie_income", "pie_saving", "monthly_summary", "balance_over_time", "financial_flow"]
+
+# "native" draws straight onto pygame surfaces; "matplotlib" builds and
+# rasterizes a figure, slower but the same output the charts export with
+CHART_BACKENDS = ["native", "matplotlib"]
+
+
+class ChartResult:
+    def __init__(self, request_id, key, rgba=None, size=None, error=None, surface=None):
+        self.request_id = request_id
+        self.key = key
+        self.rgba = rgba
+        self.size = size
+        self.error = error
+        # Set instead of rgba by the native backend
+        self.surface = surface
+
+
+class ChartWorker(threading.Thread):
+    """Render charts on a background thread, newest request first.
+
+    There is a single pending slot: submitting while a request is waiting
+    replaces it, so a burst of clicks renders only the last one. Work that
+    has been superseded is abandoned before rasterizing, and its result is
+    never delivered.
+    """
+
+    def __init__(self, db_path, on_result=None, scale=1.0, projected=False):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        # Charts come out this many times their normal pixel size
+        self.scale = scale
+        # Whether charts include recurring occurrences that are not written yet
+        self.projected = projected
+        # Called on the worker thread whenever a result becomes available
+        self.on_result = on_result
+        self.condition = threading.Condition()
+        self.pending = None
+        self.latest_id = 0
+        self.result = None
+        self.stopped = False
+        # The worker handler's summary cache, for its hit rate; set once running
+        self.summary_cache = None
+
+    def submit(self, key, chart_type, year, backend="native"):
+        if backend not in CHART_BACKENDS:
+            raise ValueError(f"Unknown chart backend: {backend}")
+        with self.condition:
+            self.latest_id += 1
+            self.pending = (self.latest_id, key, chart_type, year, backend)
+            self.result = None
+            self.condition.notify()
+            return self.latest_id
+
+    def cancel(self):
+        with self.condition:
+            self.latest_id += 1
+            self.pending = None
+            self.result = None
+
+    def poll(self):
+        """Return the finished result for the latest request, once"""
+        with self.condition:
+            result, self.result = self.result, None
+            return result
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.pending = None
+            self.condition.notify()
+
+    def is_current(self, request_id):
+        with self.condition:
+            return request_id == self.latest_id
+
+    def run(self):
+        # sqlite3 connections are bound to their thread, so the worker reads
+        # through a handler of its own. It is read-only: recurring transactions
+        # are written by the app's handler, whose listeners see them
+        handler = FinanceDataHandler(self.db_path, read_only=True)
+        self.summary_cache = handler.summary_cache
+        renderers = {}
+        try:
+            while True:
+                with self.condition:
+                    while self.pending is None and not self.stopped:
+                        self.condition.wait()
+                    if self.stopped:
+                        return
+                    request_id, key, chart_type, year, backend = self.pending
+                    self.pending = None
+                if backend not in renderers:
+                    renderers[backend] = self.create_renderer(backend, handler)
+                result = self.render(renderers[backend], backend, request_id, key, chart_type, year)
+                with self.condition:
+                    delivered = result is not None and request_id == self.latest_id
+                    if delivered:
+                        self.result = result
+                if delivered and self.on_result:
+                    self.on_result()
+        finally:
+            handler.close()
+
+    def create_renderer(self, backend, handler):
+        # Importing the charting stack here keeps matplotlib and pandas off the
+        # UI thread's startup path; starting the worker early pre-warms them
+        if backend == "native":
+            from pygame_charts import PygameChartRenderer
+            return PygameChartRenderer(handler, self.scale, self.projected)
+        from visualizer import FinanceVisualizer
+        return FinanceVisualizer(handler, self.scale, self.projected)
+
+    def render(self, renderer, backend, request_id, key, chart_type, year):
+        try:
+            if backend == "native":
+                return ChartResult(request_id, key, surface=renderer.build_chart(chart_type, year))
+            fig = renderer.build_chart(chart_type, year)
+            if fig is None:
+                return ChartResult(request_id, key)
+            if not self.is_current(request_id):
+                return None
+            rgba, size = renderer.fig_to_rgba(fig)
+            return ChartResult(request_id, key, rgba, size)
+        except Exception as e:
+            return ChartResult(request_id, key, error=e)
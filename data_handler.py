@@ -1,22 +1,457 @@
-import sqlite3
-import pandas as pd
-import os
+import argparse
+import re
+import sys
+from datetime import date, timedelta
+from functools import partial
+from itertools import islice
+
+from cache import LRUCache
+from db_setup import DEFAULT_DB_PATH, ConnectionManager
+from instrumentation import metrics
+from recurring import FREQUENCIES, occurrences
+
+# Bump SCHEMA_VERSION and append to MIGRATIONS whenever the schema changes.
+# MIGRATIONS[i] upgrades a database from user_version i to i + 1.
+SCHEMA_VERSION = 6
+
+# Per month x type x category totals, aggregated straight from transactions
+ROLLUP_SOURCE = '''
+    SELECT substr(date, 1, 7), transaction_type, category, SUM(amount), COUNT(*)
+    FROM transactions
+    GROUP BY substr(date, 1, 7), transaction_type, category
+'''
+
+# Keep monthly_rollup in step with every write path; bulk loads replace
+# the insert trigger with one aggregate per batch, see _bulk_insert()
+ROLLUP_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO monthly_rollup (month, transaction_type, category, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.transaction_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (month, transaction_type, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND transaction_type = OLD.transaction_type
+              AND category = OLD.category;
+        DELETE FROM monthly_rollup
+        WHERE month = substr(OLD.date, 1, 7) AND transaction_type = OLD.transaction_type
+              AND category = OLD.category AND count <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+    AFTER UPDATE OF date, amount, category, transaction_type ON transactions
+    BEGIN
+        UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND transaction_type = OLD.transaction_type
+              AND category = OLD.category;
+        DELETE FROM monthly_rollup
+        WHERE month = substr(OLD.date, 1, 7) AND transaction_type = OLD.transaction_type
+              AND category = OLD.category AND count <= 0;
+        INSERT INTO monthly_rollup (month, transaction_type, category, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.transaction_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (month, transaction_type, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END
+    ''',
+]
+
+# Keep the external-content search index in step with transactions
+SEARCH_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF description, category ON transactions
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+        INSERT INTO transactions_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END
+    ''',
+]
+
+# The insert triggers again, skipped while _bulk_insert() maintains the
+# rollup and search index for a whole batch. It sets the flag only inside
+# its own transaction, so no other connection ever sees it set
+GUARDED_INSERT_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON transactions
+    WHEN (SELECT bulk_load FROM trigger_control) = 0
+    BEGIN
+        INSERT INTO monthly_rollup (month, transaction_type, category, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.transaction_type, NEW.category, NEW.amount, 1)
+        ON CONFLICT (month, transaction_type, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transactions
+    WHEN (SELECT bulk_load FROM trigger_control) = 0
+    BEGIN
+        INSERT INTO transactions_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END
+    ''',
+]
+
+MIGRATIONS = [
+    [
+        'CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (transaction_type, date)',
+        'CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)',
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            month TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (month, transaction_type, category)
+        ) WITHOUT ROWID
+        ''',
+        'INSERT INTO monthly_rollup (month, transaction_type, category, total, count)' + ROLLUP_SOURCE,
+    ] + ROLLUP_TRIGGERS,
+    [
+        # Prefix indexes keep search-as-you-type queries like "am*" cheap
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            description, category,
+            content='transactions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')",
+    ] + SEARCH_TRIGGERS,
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS budgets (
+            category TEXT PRIMARY KEY,
+            monthly_limit REAL NOT NULL
+        )
+        ''',
+    ],
+    [
+        # materialized_until is the last date the rule's occurrences have been
+        # written through as transactions; later ones are only ever projected
+        '''
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            transaction_type TEXT NOT NULL,
+            frequency TEXT NOT NULL,
+            interval INTEGER NOT NULL DEFAULT 1,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            materialized_until TEXT
+        )
+        ''',
+    ],
+    [
+        'CREATE TABLE IF NOT EXISTS trigger_control (bulk_load INTEGER NOT NULL)',
+        'INSERT INTO trigger_control (bulk_load) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM trigger_control)',
+        'DROP TRIGGER IF EXISTS trg_rollup_insert',
+        'DROP TRIGGER IF EXISTS trg_fts_insert',
+    ] + GUARDED_INSERT_TRIGGERS,
+]
+
+# Largest match set search_transactions() still orders by relevance
+RANKED_SEARCH_LIMIT = 20000
+
+# Time-series granularities: the SQL mapping a `date` to the first day of its
+# bucket, and the date() modifier stepping from one bucket start to the next
+TIME_SERIES_GRANULARITIES = {
+    'day': ('date', '+1 day'),
+    'week': ("date(date, 'weekday 0', '-6 days')", '+7 days'),  # Monday-based
+    'month': ("substr(date, 1, 7) || '-01'", '+1 month'),
+    'quarter': ("substr(date, 1, 5) || printf('%02d', (CAST(substr(date, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1)"
+                " || '-01'", '+3 months'),
+    'year': ("substr(date, 1, 4) || '-01-01'", '+1 year'),
+}
+
+# Approximate days per bucket, finest first
+GRANULARITY_DAYS = [('day', 1), ('week', 7), ('month', 30.44), ('quarter', 91.31), ('year', 365.25)]
+
+# pandas is imported inside the DataFrame-returning methods: it is the bulk
+# of this module's import time and the app's menus never need it
+
+TRANSACTION_COLUMNS = ['id', 'date', 'amount', 'category', 'description', 'transaction_type']
+RULE_COLUMNS = ['id', 'amount', 'category', 'description', 'transaction_type', 'frequency', 'interval',
+                'start_date', 'end_date', 'materialized_until']
+
+# Ids per statement in bulk deletes, under SQLite's default variable limit
+ID_CHUNK = 500
+
+# Inserts at least this large update the rollup and search index once per
+# batch instead of through the per-row triggers; see _bulk_insert()
+BULK_LOAD_MIN_ROWS = 500
+
+# Stored dates start with YYYY-MM-DD; range queries and charts compare them as strings
+ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+def _bulk_insert(conn, rows):
+    """Insert transaction rows in the caller's transaction; the last new id.
+
+    Large batches run with the insert triggers off, then fold the batch
+    into monthly_rollup with one grouped upsert and into the search index
+    with one INSERT ... SELECT. The caller holds the write lock for the
+    whole transaction, so AUTOINCREMENT gives the rows consecutive ids.
+    """
+    bulk = len(rows) >= BULK_LOAD_MIN_ROWS
+    if bulk:
+        conn.execute('UPDATE trigger_control SET bulk_load = 1')
+    conn.executemany('''
+        INSERT INTO transactions (date, amount, category, description, transaction_type)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    if bulk:
+        id_range = (last_id - len(rows) + 1, last_id)
+        conn.execute('''
+            INSERT INTO monthly_rollup (month, transaction_type, category, total, count)
+            SELECT substr(date, 1, 7), transaction_type, category, SUM(amount), COUNT(*)
+            FROM transactions WHERE id BETWEEN ? AND ?
+            GROUP BY substr(date, 1, 7), transaction_type, category
+            ON CONFLICT (month, transaction_type, category)
+            DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+        ''', id_range)
+        conn.execute('''
+            INSERT INTO transactions_fts (rowid, description, category)
+            SELECT id, description, category FROM transactions WHERE id BETWEEN ? AND ?
+        ''', id_range)
+        conn.execute('UPDATE trigger_control SET bulk_load = 0')
+    return last_id
+
+def _check_date(date_str):
+    """Raise ValueError unless `date_str` starts with a valid YYYY-MM-DD date"""
+    if not isinstance(date_str, str) or not ISO_DATE.match(date_str):
+        raise ValueError(f"Invalid date {date_str!r}: expected YYYY-MM-DD")
+    date.fromisoformat(date_str[:10])
+
+def _year_bounds(year):
+    """Half-open [start, end) ISO date bounds for a calendar year"""
+    year = int(year)
+    return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+
+def _day_after(date_str):
+    return (date.fromisoformat(date_str[:10]) + timedelta(days=1)).isoformat()
+
+def _day_before(date_str):
+    return (date.fromisoformat(date_str[:10]) - timedelta(days=1)).isoformat()
+
+def _month_after(month):
+    year, month = int(month[:4]), int(month[5:7])
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+
+def _bucket_start(date_str, granularity):
+    day = date.fromisoformat(date_str[:10])
+    if granularity == 'week':
+        day -= timedelta(days=day.weekday())
+    elif granularity == 'month':
+        day = day.replace(day=1)
+    elif granularity == 'quarter':
+        day = day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    elif granularity == 'year':
+        day = day.replace(month=1, day=1)
+    return day.isoformat()
+
+def pick_granularity(start_date, end_date, max_buckets=120):
+    """Finest time-series granularity that keeps a chart under `max_buckets` points"""
+    days = (date.fromisoformat(end_date[:10]) - date.fromisoformat(start_date[:10])).days + 1
+    for granularity, length in GRANULARITY_DAYS:
+        if days / length <= max_buckets:
+            return granularity
+    return 'year'
+
+def _split_month_range(start_date, end_date):
+    """Split an inclusive date range into whole months and ragged edges.
+
+    Returns (first_month, end_month, head, tail): months in
+    [first_month, end_month) are covered completely and can be answered
+    from monthly_rollup, while head and tail are half-open date ranges
+    (or None) that still have to be read from transactions.
+    """
+    end_exclusive = _day_after(end_date)
+    first_month = start_date[:7] if start_date[8:10] == '01' else _month_after(start_date[:7])
+    end_month = end_exclusive[:7]
+    if first_month >= end_month:
+        return None, None, (start_date, end_exclusive), None
+    head = (start_date, first_month + '-01') if start_date < first_month + '-01' else None
+    tail = (end_month + '-01', end_exclusive) if end_exclusive > end_month + '-01' else None
+    return first_month, end_month, head, tail
+
+def _transaction_conditions(start_date=None, end_date=None, transaction_types=None):
+    """SQL conditions and params for an optional date range and type subset"""
+    conditions, params = [], []
+    if start_date:
+        conditions.append('date >= ?')
+        params.append(start_date)
+    if end_date:
+        conditions.append('date < ?')
+        params.append(_day_after(end_date))
+    if transaction_types:
+        conditions.append(f'transaction_type IN ({", ".join("?" * len(transaction_types))})')
+        params.extend(transaction_types)
+    return conditions, params
+
+def _transaction_filter(start_date=None, end_date=None, transaction_types=None):
+    """WHERE clause and params for an optional date range and type subset"""
+    conditions, params = _transaction_conditions(start_date, end_date, transaction_types)
+    clause = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    return clause, params
+
+def _search_match(text):
+    """FTS5 query requiring every word of `text` as a prefix, or '' when there are none"""
+    # Quoting each word keeps FTS5 operators and punctuation in user input literal
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text.lower()))
+
+def _search_filter(text, start_date, end_date, transaction_types):
+    conditions, params = _transaction_conditions(start_date, end_date, transaction_types)
+    match = _search_match(text or '')
+    if match:
+        conditions.insert(0, 'transactions_fts MATCH ?')
+        params.insert(0, match)
+    clause = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    # CROSS JOIN pins the index as the outer loop; left to itself the planner
+    # may walk the date index and run the MATCH once per transaction
+    source = 'transactions_fts f CROSS JOIN transactions t ON t.id = f.rowid' if match else 'transactions t'
+    return source, clause, params, match
+
+class Change:
+    """What one committed write did to transactions.
+
+    `kind` is "inserted", "updated" or "deleted" and `ids` the transaction
+    ids affected. `rows` holds those rows as dicts keyed by
+    TRANSACTION_COLUMNS: as they now are for inserts and updates, and as
+    they were for deletes. A "reset" change, sent once per bulk import,
+    has no ids or rows: anything derived from the ledger must be re-read.
+    """
+
+    def __init__(self, kind, ids, rows=None):
+        self.kind = kind
+        self.ids = ids
+        self.rows = rows
+
+    def __repr__(self):
+        return f"Change({self.kind!r}, {self.ids!r})"
 
 class FinanceDataHandler:
-    def __init__(self):
-        self.conn = sqlite3.connect("finance.db")
-        self.cursor = self.conn.cursor()
-        self.create_tables()
+    def __init__(self, db_path=DEFAULT_DB_PATH, connections=None, write_policy=None, read_only=False):
+        self.db_path = db_path
+        # Read-only handlers neither migrate the schema nor write recurring
+        # occurrences, and every write method fails on them
+        self.read_only = read_only
+        # A shared manager is left open for its owner; our own is closed in close()
+        self.owns_connections = connections is None
+        self.connections = connections or ConnectionManager(db_path, read_only)
+        # Bumped on every write through this handler; see data_generation()
+        self.generation = 0
+        self.summary_cache = LRUCache(64)
+        # Called with a Change after every add, update or delete; see add_listener()
+        self.listeners = []
+        # Date every recurring rule is known to be written through; see ensure_recurring()
+        self.recurring_through = None
+        # With a write policy, adds and deletes go through a write-behind
+        # journal (see write_journal.py); without one they commit in place
+        self.journal = None
+        if not read_only:
+            self.create_tables()
+        if write_policy is not None:
+            from write_journal import WriteJournal
+            self.journal = WriteJournal(self.connections, write_policy)
+
+    @property
+    def conn(self):
+        """The calling thread's connection, once any journaled writes are committed"""
+        if self.journal is not None and self.journal.has_pending():
+            self.journal.flush()
+        return self.connections.connection()
+
+    def flush(self):
+        """Commit any journaled writes now"""
+        if self.journal is not None:
+            self.journal.flush()
+
+    def add_listener(self, listener):
+        """Call listener(change) after each committed add, update, delete or restore.
+
+        Journaled writes are reported from the journal's writer thread, where
+        listeners must not call back into this handler. Imports are reported
+        as a single "reset" change rather than row by row. Writes from other
+        connections are not reported; watch data_generation() for those.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, kind, ids, rows=None):
+        if not ids and kind != 'reset':
+            return
+        change = Change(kind, ids, rows)
+        for listener in self.listeners:
+            listener(change)
+
+    def notify_committed(self, future, kind, transaction_id=None, values=None):
+        """Done-callback for a journaled write: notify once it has committed"""
+        if future.exception() is not None:
+            return
+        result = future.result()
+        if kind == 'inserted':
+            row = (result,) + values
+        elif not result:
+            return  # No such row
+        elif kind == 'deleted':
+            row = result
+        else:
+            row = (transaction_id,) + values
+        self.notify(kind, [row[0]], [dict(zip(TRANSACTION_COLUMNS, row))])
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+        if self.owns_connections:
+            self.connections.close()
+        else:
+            self.connections.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def create_tables(self):
-        self.cursor.execute('''
+        conn = self.conn
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS categories (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
                 type TEXT NOT NULL
             )
         ''')
-        self.cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 date TEXT NOT NULL,
@@ -26,67 +461,778 @@ class FinanceDataHandler:
                 transaction_type TEXT NOT NULL
             )
         ''')
-        self.conn.commit()
+        conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        conn = self.conn
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for target in range(version, SCHEMA_VERSION):
+            for statement in MIGRATIONS[target]:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {target + 1}')
+            conn.commit()
 
+    @metrics.timed('db.add_transaction')
     def add_transaction(self, date, amount, category, description, transaction_type):
-        self.cursor.execute('''
+        """The new row's id, or with a write journal a Future that resolves to it"""
+        _check_date(date)
+        values = (date, amount, category, description, transaction_type)
+        if self.journal is not None:
+            self.generation += 1
+            future = self.journal.insert(*values)
+            future.add_done_callback(partial(self.notify_committed, kind='inserted', values=values))
+            return future
+        conn = self.conn
+        cursor = conn.execute('''
             INSERT INTO transactions (date, amount, category, description, transaction_type)
             VALUES (?, ?, ?, ?, ?)
-        ''', (date, amount, category, description, transaction_type))
-        self.conn.commit()
+        ''', values)
+        conn.commit()
+        self.generation += 1
+        self.notify('inserted', [cursor.lastrowid], [dict(zip(TRANSACTION_COLUMNS, (cursor.lastrowid,) + values))])
+        return cursor.lastrowid
+
+    @metrics.timed('db.update_transaction')
+    def update_transaction(self, transaction_id, date, amount, category, description, transaction_type):
+        """Overwrite a transaction; whether it existed, or with a write journal a Future of that"""
+        _check_date(date)
+        values = (date, amount, category, description, transaction_type)
+        if self.journal is not None:
+            self.generation += 1
+            future = self.journal.update(transaction_id, *values)
+            future.add_done_callback(partial(self.notify_committed, kind='updated',
+                                             transaction_id=transaction_id, values=values))
+            return future
+        conn = self.conn
+        cursor = conn.execute('''
+            UPDATE transactions SET date = ?, amount = ?, category = ?, description = ?, transaction_type = ?
+            WHERE id = ?
+        ''', values + (transaction_id,))
+        conn.commit()
+        self.generation += 1
+        if not cursor.rowcount:
+            return False
+        self.notify('updated', [transaction_id], [dict(zip(TRANSACTION_COLUMNS, (transaction_id,) + values))])
+        return True
+
+    @metrics.timed('db.import_transactions')
+    def import_transactions(self, rows, batch_size=10000):
+        """Insert (date, amount, category, description, transaction_type) rows in batches.
+
+        Listeners get one "reset" change once the import ends, also when a
+        later batch fails after earlier ones were committed.
+        """
+        rows = iter(rows)
+        imported = 0
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                # One executemany and one commit per batch instead of per row
+                with self.conn as conn:
+                    _bulk_insert(conn, batch)
+                self.generation += 1
+                imported += len(batch)
+        finally:
+            if imported:
+                self.notify('reset', [])
+        return imported
 
+    def import_file(self, path, fmt=None, category_map=None, batch_size=10000):
+        from importer import StatementImporter
+        importer = StatementImporter(self, category_map, batch_size)
+        return importer.import_file(path, fmt)
+
+    @metrics.timed('db.get_all_transactions')
     def get_all_transactions(self):
-        self.cursor.execute('SELECT * FROM transactions')
-        rows = self.cursor.fetchall()
-        columns = ['id', 'date', 'amount', 'category', 'description', 'transaction_type']
-        return pd.DataFrame(rows, columns=columns)
+        import pandas as pd
+        rows = self.conn.execute('SELECT * FROM transactions').fetchall()
+        return pd.DataFrame(rows, columns=TRANSACTION_COLUMNS)
 
-    def get_all_categories(self):
-        self.cursor.execute('SELECT * FROM categories')
-        rows = self.cursor.fetchall()
-        columns = ['id', 'name', 'type']
-        return pd.DataFrame(rows, columns=columns)
+    @metrics.timed('db.count_transactions')
+    def count_transactions(self, start_date=None, end_date=None, transaction_types=None):
+        if not (start_date or end_date or transaction_types):
+            return self.conn.execute('SELECT COALESCE(SUM(count), 0) FROM monthly_rollup').fetchone()[0]
+        clause, params = _transaction_filter(start_date, end_date, transaction_types)
+        return self.conn.execute('SELECT COUNT(*) FROM transactions' + clause, params).fetchone()[0]
+
+    def iter_transactions(self, start_date=None, end_date=None, transaction_types=None, chunk_size=5000):
+        """Yield matching transactions as lists of row tuples, `chunk_size` rows at a time"""
+        clause, params = _transaction_filter(start_date, end_date, transaction_types)
+        # Private cursor so callers can keep querying while a stream is open
+        cursor = self.conn.execute(
+            f'SELECT {", ".join(TRANSACTION_COLUMNS)} FROM transactions{clause} ORDER BY date, id', params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    @metrics.timed('db.load_store')
+    def load_store(self, start_date=None, end_date=None, transaction_types=None, chunk_size=50000):
+        """Read matching transactions into a columnar TransactionStore, in no particular order"""
+        from transaction_store import TransactionStore
+        clause, params = _transaction_filter(start_date, end_date, transaction_types)
+        # Table order reads the file sequentially; ordering by date would
+        # hop through it via the index and more than double the load time
+        cursor = self.conn.execute(f'SELECT {", ".join(TRANSACTION_COLUMNS)} FROM transactions{clause}', params)
+        try:
+            return TransactionStore.from_chunks(iter(lambda: cursor.fetchmany(chunk_size), []))
+        finally:
+            cursor.close()
+
+    @metrics.timed('db.get_transactions_page')
+    def get_transactions_page(self, limit, after=None, before=None, inclusive=False):
+        """Return up to `limit` transactions ordered by (date, id) as a list of dicts.
 
-    def get_summary_by_category(self, transaction_type, start_date=None, end_date=None):
-        query = '''
-            SELECT category, SUM(amount) as total
-            FROM transactions
-            WHERE transaction_type = ?
+        `after`/`before` are (date, id) keys of a neighbouring row, so each
+        page is a single index range scan no matter how deep into the ledger
+        it is. With `inclusive` the `after` or `before` key itself is included.
+        """
+        query = f'SELECT {", ".join(TRANSACTION_COLUMNS)} FROM transactions'
+        params = []
+        if before is not None:
+            query += ' WHERE (date, id) <= (?, ?)' if inclusive else ' WHERE (date, id) < (?, ?)'
+            query += ' ORDER BY date DESC, id DESC LIMIT ?'
+            params.extend(before)
+        else:
+            if after is not None:
+                query += ' WHERE (date, id) >= (?, ?)' if inclusive else ' WHERE (date, id) > (?, ?)'
+                params.extend(after)
+            query += ' ORDER BY date, id LIMIT ?'
+        params.append(limit)
+        rows = self.conn.execute(query, params).fetchall()
+        if before is not None:
+            rows.reverse()
+        return [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows]
+
+    @metrics.timed('db.search_transactions')
+    def search_transactions(self, text, limit, offset=0, start_date=None, end_date=None, transaction_types=None):
+        """Return up to `limit` transactions matching `text`, best match first, as a list of dicts.
+
+        Every word of `text` must prefix-match the description or category.
+        Ranking has to score every match before the first row comes back, so
+        searches matching more than RANKED_SEARCH_LIMIT transactions list the
+        newest first instead. Without any words the filtered transactions are
+        listed by (date, id).
+        """
+        source, clause, params, match = _search_filter(text, start_date, end_date, transaction_types)
+        if not match:
+            order = 't.date, t.id'
+        elif self.conn.execute('SELECT 1 FROM transactions_fts WHERE transactions_fts MATCH ? LIMIT 1 OFFSET ?',
+                               (match, RANKED_SEARCH_LIMIT)).fetchone():
+            order = 'f.rowid DESC'
+        else:
+            order = 'f.rank, f.rowid DESC'
+        query = f'''
+            SELECT {", ".join("t." + column for column in TRANSACTION_COLUMNS)}
+            FROM {source}{clause}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
         '''
-        params = [transaction_type]
+        rows = self.conn.execute(query, params + [limit, offset]).fetchall()
+        return [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows]
+
+    @metrics.timed('db.count_search_results')
+    def count_search_results(self, text, start_date=None, end_date=None, transaction_types=None):
+        source, clause, params, match = _search_filter(text, start_date, end_date, transaction_types)
+        if match and len(params) == 1:
+            # Nothing to check against transactions, so skip the join
+            source, clause = 'transactions_fts', ' WHERE transactions_fts MATCH ?'
+        return self.conn.execute(f'SELECT COUNT(*) FROM {source}{clause}', params).fetchone()[0]
+
+    @metrics.timed('db.get_all_categories')
+    def get_all_categories(self):
+        import pandas as pd
+        return pd.DataFrame(self.list_categories(), columns=['id', 'name', 'type'])
+
+    @metrics.timed('db.list_categories')
+    def list_categories(self):
+        """Categories as a list of {'id', 'name', 'type'} dicts"""
+        rows = self.conn.execute('SELECT id, name, type FROM categories').fetchall()
+        return [dict(zip(('id', 'name', 'type'), row)) for row in rows]
+
+    @metrics.timed('db.get_summary_by_category')
+    def get_summary_by_category(self, transaction_type, start_date=None, end_date=None, projected=False):
+        """Totals per category; with `projected`, plus unwritten recurring occurrences in the range.
+
+        Without both dates the totals cover the whole ledger, and projected
+        occurrences run through the end of the current year, as the balance
+        chart's do.
+        """
+        self.ensure_recurring(end_date)
+        if not projected:
+            return self._cached(('category', transaction_type, start_date, end_date),
+                                lambda: self._query_summary_by_category(transaction_type, start_date, end_date))
         if start_date and end_date:
-            query += ' AND date BETWEEN ? AND ?'
-            params.extend([start_date, end_date])
-        query += ' GROUP BY category'
-        self.cursor.execute(query, params)
-        rows = self.cursor.fetchall()
-        return pd.DataFrame(rows, columns=['category', 'total'])
+            project_start, project_end = start_date, end_date
+        else:
+            project_start, project_end = None, f"{date.today().year}-12-31"
+        return self._cached(('category', transaction_type, start_date, end_date, 'projected', project_end),
+                            lambda: self._add_projected_categories(
+                                self._query_summary_by_category(transaction_type, start_date, end_date),
+                                transaction_type, project_start, project_end))
+
+    def _add_projected_categories(self, df, transaction_type, start_date, end_date):
+        import pandas as pd
+        projected = self._projected_frame(start_date, end_date)
+        projected = projected[projected['transaction_type'] == transaction_type]
+        if projected.empty:
+            return df
+        df = pd.concat([df, projected[['category', 'amount']].rename(columns={'amount': 'total'})])
+        return df.groupby('category', as_index=False)['total'].sum()
 
-    def get_monthly_summary(self, year):
-        query = '''
-            SELECT strftime('%m', date) as month, 
-                   strftime('%Y', date) as year,
-                   SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) as income,
-                   SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END) as expense,
-                   SUM(CASE WHEN transaction_type = 'saving' THEN amount ELSE 0 END) as saving
-            FROM transactions
-            WHERE strftime('%Y', date) = ?
-            GROUP BY strftime('%m', date)
+    @metrics.timed('db.summary_by_category.query')
+    def _query_summary_by_category(self, transaction_type, start_date, end_date):
+        import pandas as pd
+        if not (start_date and end_date):
+            rows = self.conn.execute('''
+                SELECT category, SUM(total) as total
+                FROM monthly_rollup
+                WHERE transaction_type = ?
+                GROUP BY category
+            ''', (transaction_type,)).fetchall()
+            return pd.DataFrame(rows, columns=['category', 'total'])
+
+        # Whole months come from the rollup; only the partial months at either
+        # end of the range are summed from transactions (half-open ranges over
+        # the (transaction_type, date) index)
+        first_month, end_month, head, tail = _split_month_range(start_date, end_date)
+        parts, params = [], []
+        if first_month:
+            parts.append('''
+                SELECT category, total FROM monthly_rollup
+                WHERE transaction_type = ? AND month >= ? AND month < ?
+            ''')
+            params.extend([transaction_type, first_month, end_month])
+        for date_range in (head, tail):
+            if date_range:
+                parts.append('''
+                    SELECT category, amount AS total FROM transactions
+                    WHERE transaction_type = ? AND date >= ? AND date < ?
+                ''')
+                params.extend([transaction_type, *date_range])
+        query = f'''
+            SELECT category, SUM(total) as total
+            FROM ({' UNION ALL '.join(parts)})
+            GROUP BY category
         '''
-        self.cursor.execute(query, (year,))
-        rows = self.cursor.fetchall()
-        df = pd.DataFrame(rows, columns=['month', 'year', 'income', 'expense', 'saving'])
+        rows = self.conn.execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=['category', 'total'])
+
+    @metrics.timed('db.get_monthly_summary')
+    def get_monthly_summary(self, year, projected=False):
+        """Income, expense and saving per month; with `projected`, plus unwritten recurring occurrences"""
+        self.ensure_recurring(f"{year}-12-31")
+        if not projected:
+            return self._cached(('monthly', year), lambda: self._query_monthly_summary(year))
+        return self._cached(('monthly', year, 'projected'),
+                            lambda: self._add_projected_months(self._query_monthly_summary(year), year))
+
+    def _add_projected_months(self, df, year):
+        import pandas as pd
+        try:
+            year_start, year_end = _year_bounds(year)
+        except ValueError:
+            return df
+        projected = self._projected_frame(year_start, _day_before(year_end))
+        if projected.empty:
+            return df
+        projected['month'] = projected['date'].str[5:7]
+        by_month = projected.pivot_table(index='month', columns='transaction_type', values='amount',
+                                         aggfunc='sum', fill_value=0)
+        by_month = by_month.reindex(columns=['income', 'expense', 'saving'], fill_value=0).reset_index()
+        df = pd.concat([df[['month', 'income', 'expense', 'saving']], by_month]).groupby('month', as_index=False).sum()
+        df.insert(1, 'year', year_start[:4])
         df['month_name'] = pd.to_datetime(df['month'], format='%m').dt.strftime('%B')
         return df
 
+    @metrics.timed('db.monthly_summary.query')
+    def _query_monthly_summary(self, year):
+        import pandas as pd
+        columns = ['month', 'year', 'income', 'expense', 'saving']
+        try:
+            year_start, year_end = _year_bounds(year)
+        except ValueError:
+            rows = []
+        else:
+            query = '''
+                SELECT substr(month, 6, 2) as month,
+                       substr(month, 1, 4) as year,
+                       SUM(CASE WHEN transaction_type = 'income' THEN total ELSE 0 END) as income,
+                       SUM(CASE WHEN transaction_type = 'expense' THEN total ELSE 0 END) as expense,
+                       SUM(CASE WHEN transaction_type = 'saving' THEN total ELSE 0 END) as saving
+                FROM monthly_rollup
+                WHERE month >= ? AND month < ?
+                GROUP BY month
+            '''
+            rows = self.conn.execute(query, (year_start[:7], year_end[:7])).fetchall()
+        df = pd.DataFrame(rows, columns=columns)
+        df['month_name'] = pd.to_datetime(df['month'], format='%m').dt.strftime('%B')
+        return df
+
+    @metrics.timed('db.get_category_totals')
+    def get_category_totals(self, month, transaction_type='expense'):
+        """{category: total} for one 'YYYY-MM' month, read from the rollup"""
+        rows = self.conn.execute('''
+            SELECT category, total FROM monthly_rollup WHERE month = ? AND transaction_type = ?
+        ''', (month, transaction_type)).fetchall()
+        return dict(rows)
+
+    @metrics.timed('db.get_date_range')
+    def get_date_range(self):
+        """(first, last) transaction dates, or (None, None) for an empty ledger"""
+        # Separate subqueries so each is a single seek on idx_transactions_date;
+        # MIN and MAX in one select scan the whole index
+        return self.conn.execute('SELECT (SELECT MIN(date) FROM transactions), '
+                                 '(SELECT MAX(date) FROM transactions)').fetchone()
+
+    @metrics.timed('db.get_time_series')
+    def get_time_series(self, start_date=None, end_date=None, granularity='month', projected=False):
+        """Income, expense and saving per bucket with a running balance.
+
+        Buckets are TIME_SERIES_GRANULARITIES periods covering the inclusive
+        range (the whole ledger by default), including empty ones. The
+        balance is cumulative income minus expense since the first
+        transaction, not just since `start_date`. With `projected`, unwritten
+        recurring occurrences up to `end_date` count as well.
+        """
+        if granularity not in TIME_SERIES_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(TIME_SERIES_GRANULARITIES)}")
+        self.ensure_recurring(end_date)
+        if not (start_date and end_date):
+            first, last = self.get_date_range()
+            start_date, end_date = start_date or first, end_date or last
+        if not projected:
+            return self._cached(('series', start_date, end_date, granularity),
+                                lambda: self._query_time_series(start_date, end_date, granularity))
+        return self._cached(('series', start_date, end_date, granularity, 'projected'),
+                            lambda: self._add_projected_series(
+                                self._query_time_series(start_date, end_date, granularity),
+                                start_date, end_date, granularity))
+
+    def _add_projected_series(self, df, start_date, end_date, granularity):
+        if df.empty:
+            return df
+        projected = self._projected_frame(None, end_date)
+        if projected.empty:
+            return df
+        projected['net'] = projected['amount'] * projected['transaction_type'].map({'income': 1, 'expense': -1}).fillna(0)
+        # Occurrences before the range move its opening balance
+        opening = projected.loc[projected['date'] < start_date[:10], 'net'].sum()
+        inside = projected[projected['date'] >= start_date[:10]].copy()
+        inside['period'] = [_bucket_start(day, granularity) for day in inside['date']]
+        added = inside.pivot_table(index='period', columns='transaction_type', values='amount',
+                                   aggfunc='sum', fill_value=0)
+        df = df.set_index('period')
+        added = added.reindex(index=df.index, columns=['income', 'expense', 'saving'], fill_value=0)
+        df[['income', 'expense', 'saving']] += added
+        net = added['income'] - added['expense']
+        df['net'] += net
+        df['balance'] += opening + net.cumsum()
+        return df.reset_index()
+
+    @metrics.timed('db.time_series.query')
+    def _query_time_series(self, start_date, end_date, granularity):
+        import pandas as pd
+        columns = ['period', 'income', 'expense', 'saving', 'net', 'balance']
+        if not (start_date and end_date) or start_date[:10] > end_date[:10]:
+            return pd.DataFrame([], columns=columns)
+        start_date, end_date = start_date[:10], end_date[:10]
+        bucket, step = TIME_SERIES_GRANULARITIES[granularity]
+
+        # Month-sized buckets and up read whole months from the rollup and only
+        # the ragged edges from transactions; days and weeks need every row
+        if granularity in ('day', 'week'):
+            first_month, end_month, head, tail = None, None, (start_date, _day_after(end_date)), None
+        else:
+            first_month, end_month, head, tail = _split_month_range(start_date, end_date)
+        parts, params = [], []
+        if first_month:
+            parts.append("SELECT month || '-01' AS date, transaction_type, total AS amount FROM monthly_rollup"
+                         " WHERE month >= ? AND month < ?")
+            params.extend([first_month, end_month])
+        for date_range in (head, tail):
+            if date_range:
+                parts.append('SELECT date, transaction_type, amount FROM transactions WHERE date >= ? AND date < ?')
+                params.extend(date_range)
+
+        # Buckets come from a recursive CTE so empty periods still get a row,
+        # and one window pass over them accumulates the balance
+        query = f'''
+            WITH RECURSIVE buckets (period) AS (
+                SELECT ?
+                UNION ALL
+                SELECT date(period, '{step}') FROM buckets WHERE date(period, '{step}') <= ?
+            ),
+            totals AS (
+                SELECT {bucket} AS period,
+                       SUM(CASE WHEN transaction_type = 'income' THEN amount ELSE 0 END) AS income,
+                       SUM(CASE WHEN transaction_type = 'expense' THEN amount ELSE 0 END) AS expense,
+                       SUM(CASE WHEN transaction_type = 'saving' THEN amount ELSE 0 END) AS saving
+                FROM ({' UNION ALL '.join(parts)})
+                GROUP BY 1
+            )
+            SELECT b.period,
+                   COALESCE(t.income, 0), COALESCE(t.expense, 0), COALESCE(t.saving, 0),
+                   COALESCE(t.income, 0) - COALESCE(t.expense, 0),
+                   ? + SUM(COALESCE(t.income, 0) - COALESCE(t.expense, 0)) OVER (ORDER BY b.period)
+            FROM buckets b
+            LEFT JOIN totals t USING (period)
+            ORDER BY b.period
+        '''
+        params = [_bucket_start(start_date, granularity), end_date] + params + [self._opening_balance(start_date)]
+        rows = self.conn.execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def _opening_balance(self, start_date):
+        """Income minus expense of everything dated before `start_date`"""
+        return self.conn.execute('''
+            SELECT COALESCE(SUM(CASE transaction_type WHEN 'income' THEN amount
+                                                      WHEN 'expense' THEN -amount ELSE 0 END), 0)
+            FROM (
+                SELECT transaction_type, total AS amount FROM monthly_rollup WHERE month < ?
+                UNION ALL
+                SELECT transaction_type, amount FROM transactions WHERE date >= ? AND date < ?
+            )
+        ''', (start_date[:7], start_date[:7] + '-01', start_date)).fetchone()[0]
+
     def export_to_csv(self, filename):
-        transactions_df = self.get_all_transactions()
-        transactions_df.to_csv(filename, index=False)
-        return os.path.abspath(filename)
+        return self.export_transactions(filename, fmt='csv')
+
+    @metrics.timed('db.export_transactions')
+    def export_transactions(self, filename, fmt=None, start_date=None, end_date=None,
+                            transaction_types=None, chunk_size=5000, progress=None):
+        from exporter import TransactionExporter
+        exporter = TransactionExporter(self, chunk_size)
+        return exporter.export(filename, fmt, start_date, end_date, transaction_types, progress)
 
+    @metrics.timed('db.delete_transaction')
     def delete_transaction(self, transaction_id):
-        self.cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        self.conn.commit()
+        if self.journal is not None:
+            self.generation += 1
+            future = self.journal.delete(transaction_id)
+            future.add_done_callback(partial(self.notify_committed, kind='deleted', transaction_id=transaction_id))
+            return future
+        conn = self.conn
+        row = conn.execute(f'DELETE FROM transactions WHERE id = ? RETURNING {", ".join(TRANSACTION_COLUMNS)}',
+                           (transaction_id,)).fetchone()
+        conn.commit()
+        self.generation += 1
+        if row:
+            self.notify('deleted', [transaction_id], [dict(zip(TRANSACTION_COLUMNS, row))])
+
+    @metrics.timed('db.delete_transactions')
+    def delete_transactions(self, transaction_ids):
+        """Delete many transactions in one commit.
+
+        Returns the deleted rows as dicts, which restore_transactions() puts
+        back to undo the delete. Ids that do not exist are skipped.
+        """
+        ids = iter(transaction_ids)
+        deleted = []
+        # Reading self.conn commits anything still queued in the journal first
+        with self.conn as conn:
+            while chunk := list(islice(ids, ID_CHUNK)):
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(f'SELECT {", ".join(TRANSACTION_COLUMNS)} FROM transactions '
+                                    f'WHERE id IN ({placeholders})', chunk).fetchall()
+                conn.execute(f'DELETE FROM transactions WHERE id IN ({placeholders})', chunk)
+                deleted.extend(dict(zip(TRANSACTION_COLUMNS, row)) for row in rows)
+        self.generation += 1
+        self.notify('deleted', [row['id'] for row in deleted], deleted)
+        return deleted
+
+    @metrics.timed('db.restore_transactions')
+    def restore_transactions(self, rows):
+        """Re-insert deleted rows (dicts keyed by TRANSACTION_COLUMNS) under their original ids.
+
+        Rows whose id exists again, say from undoing the same delete twice,
+        are skipped. Returns the number of rows restored.
+        """
+        rows = list(rows)
+        with self.conn as conn:
+            ids = iter([row['id'] for row in rows])
+            existing = set()
+            while chunk := list(islice(ids, ID_CHUNK)):
+                existing.update(row_id for row_id, in conn.execute(
+                    f'SELECT id FROM transactions WHERE id IN ({", ".join("?" * len(chunk))})', chunk))
+            rows = [row for row in rows if row['id'] not in existing]
+            conn.executemany(f'''
+                INSERT INTO transactions ({", ".join(TRANSACTION_COLUMNS)})
+                VALUES ({", ".join("?" * len(TRANSACTION_COLUMNS))})
+            ''', [[row[column] for column in TRANSACTION_COLUMNS] for row in rows])
+        self.generation += 1
+        self.notify('inserted', [row['id'] for row in rows], rows)
+        return len(rows)
+
+    def add_recurring_rule(self, amount, category, description, transaction_type, start_date,
+                           frequency='monthly', interval=1, end_date=None):
+        """Store a rule repeating a transaction every `interval` days, weeks, months or years.
+
+        Nothing is written to transactions here; materialize_recurring()
+        does that for occurrences up to today, and later ones are only
+        projected. Returns the rule's id.
+        """
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+        for value in (start_date, end_date):
+            if value:
+                _check_date(value)
+        with self.conn as conn:
+            cursor = conn.execute('''
+                INSERT INTO recurring_rules
+                    (amount, category, description, transaction_type, frequency, interval, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (amount, category, description, transaction_type, frequency, interval, start_date, end_date))
+        self.recurring_through = None
+        self.generation += 1
+        return cursor.lastrowid
+
+    def list_recurring_rules(self):
+        """Recurring rules as dicts keyed by RULE_COLUMNS"""
+        rows = self.conn.execute(f'SELECT {", ".join(RULE_COLUMNS)} FROM recurring_rules ORDER BY id').fetchall()
+        return [dict(zip(RULE_COLUMNS, row)) for row in rows]
+
+    def remove_recurring_rule(self, rule_id):
+        """Stop a rule, keeping the transactions it already wrote; whether it existed"""
+        with self.conn as conn:
+            removed = conn.execute('DELETE FROM recurring_rules WHERE id = ?', (rule_id,)).rowcount > 0
+        self.generation += 1
+        return removed
+
+    @metrics.timed('db.materialize_recurring')
+    def materialize_recurring(self, through=None):
+        """Write every recurring occurrence due up to `through` (today by default) in one commit.
+
+        Each rule remembers the date it has been written through, so only
+        new occurrences are inserted, with a single executemany however long
+        the app was closed. Returns the number of transactions written.
+        """
+        through = (through or date.today().isoformat())[:10]
+        conn = self.conn
+        # Take the write lock before reading the watermarks, so a second
+        # handler catching up at the same time waits and then finds nothing due
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rules = conn.execute(f'''
+                SELECT {", ".join(RULE_COLUMNS)} FROM recurring_rules
+                WHERE start_date <= ? AND (materialized_until IS NULL OR materialized_until < ?)
+                      AND (end_date IS NULL OR materialized_until IS NULL OR materialized_until < end_date)
+            ''', (through, through)).fetchall()
+            values = []
+            for rule in rules:
+                rule = dict(zip(RULE_COLUMNS, rule))
+                last = min(through, rule['end_date']) if rule['end_date'] else through
+                values.extend((day, rule['amount'], rule['category'], rule['description'], rule['transaction_type'])
+                              for day in occurrences(rule['start_date'], rule['frequency'], rule['interval'],
+                                                     rule['materialized_until'], last))
+            last_id = _bulk_insert(conn, values)
+            conn.executemany('UPDATE recurring_rules SET materialized_until = ? WHERE id = ?',
+                             [(through, rule[0]) for rule in rules])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.recurring_through = max(self.recurring_through or through, through)
+        if values:
+            self.generation += 1
+            ids = list(range(last_id - len(values) + 1, last_id + 1))
+            self.notify('inserted', ids, [dict(zip(TRANSACTION_COLUMNS, (row_id,) + row))
+                                          for row_id, row in zip(ids, values)])
+        return len(values)
+
+    def ensure_recurring(self, through=None):
+        """Materialize recurring occurrences up to `through` (today at the latest) unless already done"""
+        if self.read_only:
+            # Occurrences due but not written still show with projected=True
+            return
+        today = date.today().isoformat()
+        through = min(through[:10], today) if through else today
+        if self.recurring_through is None or through > self.recurring_through:
+            self.materialize_recurring(through)
+
+    def get_projected_transactions(self, start_date, end_date):
+        """Recurring occurrences in the inclusive range that are not written yet, in date order.
+
+        Rows are (date, amount, category, description, transaction_type)
+        tuples; nothing is stored. `start_date` may be None for every
+        unwritten occurrence up to `end_date`.
+        """
+        rows = []
+        for rule in self.list_recurring_rules():
+            after = rule['materialized_until']
+            if start_date and (after is None or after < start_date[:10]):
+                after = _day_before(start_date)
+            last = min(end_date[:10], rule['end_date']) if rule['end_date'] else end_date[:10]
+            rows.extend((day, rule['amount'], rule['category'], rule['description'], rule['transaction_type'])
+                        for day in occurrences(rule['start_date'], rule['frequency'], rule['interval'], after, last))
+        rows.sort(key=lambda row: row[0])
+        return rows
+
+    def _projected_frame(self, start_date, end_date):
+        import pandas as pd
+        rows = self.get_projected_transactions(start_date, end_date)
+        return pd.DataFrame(rows, columns=['date', 'amount', 'category', 'description', 'transaction_type'])
+
+    def get_budgets(self):
+        """{category: monthly limit}"""
+        return dict(self.conn.execute('SELECT category, monthly_limit FROM budgets').fetchall())
+
+    def set_budget(self, category, monthly_limit):
+        with self.conn as conn:
+            conn.execute('''
+                INSERT INTO budgets (category, monthly_limit) VALUES (?, ?)
+                ON CONFLICT (category) DO UPDATE SET monthly_limit = excluded.monthly_limit
+            ''', (category, monthly_limit))
+
+    def remove_budget(self, category):
+        """Whether there was a budget to remove"""
+        with self.conn as conn:
+            return conn.execute('DELETE FROM budgets WHERE category = ?', (category,)).rowcount > 0
+
+    def data_generation(self):
+        """Token that changes whenever the ledger may have changed.
+
+        Combines this handler's own write counter with SQLite's data_version,
+        which moves when another connection (an import, a second handler)
+        commits to the same file.
+        """
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        return self.generation, data_version
+
+    def data_version(self):
+        """SQLite's data_version on the calling thread's connection, without flushing the journal.
+
+        It moves when any other connection commits, the journal's writer
+        included, and is only comparable between calls on the same thread.
+        """
+        return self.connections.connection().execute('PRAGMA data_version').fetchone()[0]
+
+    def _cached(self, key, compute):
+        key = (key, self.data_generation())
+        df = self.summary_cache.get(key)
+        if df is None:
+            df = compute()
+            self.summary_cache.put(key, df)
+        # Charts add columns to the frames they receive
+        return df.copy()
+
+    @metrics.timed('db.rebuild_rollups')
+    def rebuild_rollups(self, check_only=False):
+        """Compare monthly_rollup with a fresh aggregate and rewrite it if they differ.
+
+        Returns the number of (month, type, category) rows that were wrong.
+        """
+        mismatches = self.conn.execute(f'''
+            WITH expected (month, transaction_type, category, total, count) AS ({ROLLUP_SOURCE})
+            SELECT COUNT(*) FROM (
+                SELECT e.month FROM expected e
+                LEFT JOIN monthly_rollup r USING (month, transaction_type, category)
+                WHERE r.count IS NULL OR r.count != e.count OR abs(r.total - e.total) > 1e-6
+                UNION ALL
+                SELECT r.month FROM monthly_rollup r
+                LEFT JOIN expected e USING (month, transaction_type, category)
+                WHERE e.count IS NULL
+            )
+        ''').fetchone()[0]
+        if mismatches and not check_only:
+            with self.conn:
+                self.conn.execute('DELETE FROM monthly_rollup')
+                self.conn.execute('INSERT INTO monthly_rollup (month, transaction_type, category, total, count)'
+                                  + ROLLUP_SOURCE)
+            self.generation += 1
+        return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Finance database maintenance")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild-rollups", help="verify and repair the monthly rollup table")
+    rebuild.add_argument("--check", action="store_true", help="only report mismatches, do not repair")
+    commands.add_parser("budgets", help="list monthly budgets and this month's spending against them")
+    set_budget = commands.add_parser("set-budget", help="set a category's monthly spending limit")
+    set_budget.add_argument("category")
+    set_budget.add_argument("limit", type=float)
+    remove_budget = commands.add_parser("remove-budget", help="remove a category's monthly budget")
+    remove_budget.add_argument("category")
+    commands.add_parser("recurring", help="list recurring rules")
+    add_recurring = commands.add_parser("add-recurring", help="add a recurring transaction")
+    add_recurring.add_argument("transaction_type", choices=["income", "expense", "saving"])
+    add_recurring.add_argument("category")
+    add_recurring.add_argument("amount", type=float)
+    add_recurring.add_argument("start_date", help="first occurrence, YYYY-MM-DD")
+    add_recurring.add_argument("--frequency", choices=FREQUENCIES, default="monthly")
+    add_recurring.add_argument("--every", type=int, default=1, metavar="N", help="repeat every N periods")
+    add_recurring.add_argument("--until", metavar="DATE", help="last possible occurrence, YYYY-MM-DD")
+    add_recurring.add_argument("--description", default="")
+    remove_recurring = commands.add_parser("remove-recurring", help="stop a recurring rule, keeping its transactions")
+    remove_recurring.add_argument("rule_id", type=int)
+    materialize = commands.add_parser("materialize", help="write recurring transactions due up to a date")
+    materialize.add_argument("--through", metavar="DATE", help="last date to write (default: today)")
+    args = parser.parse_args(argv)
+
+    with FinanceDataHandler(args.db) as handler:
+        if args.command == "rebuild-rollups":
+            mismatches = handler.rebuild_rollups(check_only=args.check)
+            if not mismatches:
+                print("Rollups are up to date")
+            elif args.check:
+                print(f"{mismatches} rollup rows are out of date")
+                return 1
+            else:
+                print(f"Rebuilt rollups ({mismatches} rows were out of date)")
+        elif args.command == "budgets":
+            from budgets import BudgetMonitor
+            monitor = BudgetMonitor(handler)
+            if not monitor.budgets:
+                print("No budgets set")
+            for category, spent, limit in monitor.status():
+                print(f"{category:<20} {spent:>10.2f} / {limit:<10.2f} {spent / limit:>6.0%}")
+        elif args.command == "set-budget":
+            if args.limit <= 0:
+                parser.error("limit must be positive")
+            handler.set_budget(args.category, args.limit)
+            print(f"{args.category}: {args.limit:.2f} per month")
+        elif args.command == "remove-budget":
+            if not handler.remove_budget(args.category):
+                print(f"No budget for {args.category}")
+                return 1
+            print(f"Removed the budget for {args.category}")
+        elif args.command == "recurring":
+            rules = handler.list_recurring_rules()
+            if not rules:
+                print("No recurring rules")
+            for rule in rules:
+                every = rule['frequency'] if rule['interval'] == 1 else f"every {rule['interval']} {rule['frequency']}"
+                print(f"{rule['id']:>4} {rule['transaction_type']:<8} {rule['category']:<20} {rule['amount']:>10.2f} "
+                      f"{every:<16} from {rule['start_date']} until {rule['end_date'] or '-'}, "
+                      f"written through {rule['materialized_until'] or '-'}")
+        elif args.command == "add-recurring":
+            if args.amount <= 0:
+                parser.error("amount must be positive")
+            try:
+                rule_id = handler.add_recurring_rule(args.amount, args.category, args.description,
+                                                     args.transaction_type, args.start_date, args.frequency,
+                                                     args.every, args.until)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Added recurring rule {rule_id}; wrote {handler.materialize_recurring()} transactions")
+        elif args.command == "remove-recurring":
+            if not handler.remove_recurring_rule(args.rule_id):
+                print(f"No recurring rule {args.rule_id}")
+                return 1
+            print(f"Removed recurring rule {args.rule_id}")
+        elif args.command == "materialize":
+            print(f"Wrote {handler.materialize_recurring(args.through)} recurring transactions")
+    return 0
 
-    def __del__(self):
-        self.conn.close()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
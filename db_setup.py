@@ -1,15 +1,101 @@
 import sqlite3
-import os
+import threading
+from pathlib import Path
 
-def create_database():
+# The one database file shared by the app, the CLIs and background workers
+DEFAULT_DB_PATH = "finance.db"
+
+# Applied to every connection. WAL lets readers on other threads run while
+# the UI commits; NORMAL sync is durable across application crashes in WAL
+# mode and only risks the last commits on power loss.
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -32000),  # KiB, i.e. 32 MB of page cache
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+]
+
+# Database-wide settings a read-only connection can neither set nor needs
+WRITE_PRAGMAS = {"journal_mode", "synchronous"}
+
+# Seconds a writer waits on another connection's lock before giving up
+BUSY_TIMEOUT = 5.0
+
+
+def connect(db_path=DEFAULT_DB_PATH, read_only=False):
+    """Open a connection to `db_path` with PRAGMAS applied"""
+    target = db_path
+    if read_only:
+        # mode=ro fails on a missing file instead of creating it, and on any write
+        target = Path(db_path).resolve().as_uri() + "?mode=ro"
+    # Connections are still used from one thread only; this just lets the
+    # owning ConnectionManager close them from whichever thread shuts down
+    conn = sqlite3.connect(target, timeout=BUSY_TIMEOUT, check_same_thread=False, uri=read_only)
+    for name, value in PRAGMAS:
+        if not (read_only and name in WRITE_PRAGMAS):
+            conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionManager:
+    """Hand out one tuned connection per thread and close them all together"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.closed = False
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.closed:
+            with self.lock:
+                if self.closed:
+                    raise sqlite3.ProgrammingError("connection manager is closed")
+                conn = self.local.conn = connect(self.db_path, self.read_only)
+                self.connections.append(conn)
+        return conn
+
+    def release(self):
+        """Close the calling thread's connection, if it has one"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            return
+        self.local.conn = None
+        with self.lock:
+            self.connections.remove(conn)
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def create_database(db_path=DEFAULT_DB_PATH):
     # Create database if it doesn't exist
-    if not os.path.exists('finance_tracker.db'):
-        conn = sqlite3.connect('finance_tracker.db')
+    conn = connect(db_path)
+    try:
         cursor = conn.cursor()
-        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'categories'")
+        if cursor.fetchone():
+            print("Database already exists!")
+            return
+
         # Create transactions table
         cursor.execute('''
-        CREATE TABLE transactions (
+        CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             date TEXT NOT NULL,
             amount REAL NOT NULL,
@@ -18,7 +104,7 @@ def create_database():
             transaction_type TEXT NOT NULL
         )
         ''')
-        
+
         # Create categories table
         cursor.execute('''
         CREATE TABLE categories (
@@ -27,7 +113,7 @@ def create_database():
             type TEXT NOT NULL
         )
         ''')
-        
+
         # Insert default categories
         default_categories = [
             ('Salary', 'income'),
@@ -40,14 +126,13 @@ def create_database():
             ('Savings', 'saving'),
             ('Investment', 'saving')
         ]
-        
+
         cursor.executemany('INSERT INTO categories (name, type) VALUES (?, ?)', default_categories)
-        
+
         conn.commit()
-        conn.close()
         print("Database created successfully!")
-    else:
-        print("Database already exists!")
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     create_database()
@@ -0,0 +1,208 @@
+import argparse
+import csv
+import gzip
+import os
+import sys
+import threading
+
+from data_handler import FinanceDataHandler, TRANSACTION_COLUMNS
+from db_setup import DEFAULT_DB_PATH
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Longest suffix first so "x.csv.gz" is not taken for plain gzip
+FORMAT_EXTENSIONS = [
+    (".csv.gz", "csv.gz"),
+    (".gz", "csv.gz"),
+    (".csv", "csv"),
+    (".parquet", "parquet"),
+    (".arrow", "arrow"),
+    (".feather", "arrow"),
+]
+
+
+class ExportError(Exception):
+    pass
+
+
+def detect_format(filename):
+    lowered = filename.lower()
+    for extension, fmt in FORMAT_EXTENSIONS:
+        if lowered.endswith(extension):
+            return fmt
+    raise ExportError(f"cannot infer export format from {filename!r}")
+
+
+def write_csv(filename, chunks):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TRANSACTION_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def write_csv_gz(filename, chunks):
+    with gzip.open(filename, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(TRANSACTION_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def _arrow_modules():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet/Arrow export requires the 'pyarrow' package")
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.string()),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+        ("transaction_type", pa.string()),
+    ])
+
+
+def _arrow_tables(pa, schema, chunks):
+    # Each chunk becomes one record batch / row group
+    for chunk in chunks:
+        columns = list(zip(*chunk))
+        yield pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema)
+
+
+def write_parquet(filename, chunks):
+    pa = _arrow_modules()
+    schema = _arrow_schema(pa)
+    with pa.parquet.ParquetWriter(filename, schema, compression="snappy") as writer:
+        for table in _arrow_tables(pa, schema, chunks):
+            writer.write_table(table)
+
+
+def write_arrow(filename, chunks):
+    pa = _arrow_modules()
+    schema = _arrow_schema(pa)
+    with pa.OSFile(filename, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for table in _arrow_tables(pa, schema, chunks):
+            writer.write_table(table)
+
+
+WRITERS = {
+    "csv": write_csv,
+    "csv.gz": write_csv_gz,
+    "parquet": write_parquet,
+    "arrow": write_arrow,
+}
+
+
+class TransactionExporter:
+    def __init__(self, data_handler, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.data_handler = data_handler
+        self.chunk_size = chunk_size
+
+    def export(self, filename, fmt=None, start_date=None, end_date=None, transaction_types=None, progress=None):
+        """Stream matching transactions to `filename`, one chunk in memory at a time"""
+        fmt = fmt or detect_format(filename)
+        if fmt not in WRITERS:
+            raise ExportError(f"unsupported export format {fmt!r}")
+        if fmt in ("parquet", "arrow"):
+            _arrow_modules()
+
+        total = self.data_handler.count_transactions(start_date, end_date, transaction_types)
+        chunks = self.data_handler.iter_transactions(start_date, end_date, transaction_types, self.chunk_size)
+
+        def reporting(chunks):
+            written = 0
+            for chunk in chunks:
+                yield chunk
+                written += len(chunk)
+                if progress:
+                    progress(written, total)
+
+        # Write next to the target and rename so a failed export never
+        # leaves a truncated file behind
+        partial = filename + ".part"
+        try:
+            WRITERS[fmt](partial, reporting(chunks))
+            os.replace(partial, filename)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        if progress and total == 0:
+            progress(0, 0)
+        return os.path.abspath(filename)
+
+
+class ExportJob(threading.Thread):
+    """Run an export in the background; poll `done`, `fraction` and `error`"""
+
+    def __init__(self, db_path, filename, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.options = options
+        self.rows_written = 0
+        self.total_rows = None
+        self.result = None
+        self.error = None
+        self.done = False
+
+    @property
+    def fraction(self):
+        if not self.total_rows:
+            return 1.0 if self.done else 0.0
+        return self.rows_written / self.total_rows
+
+    def _progress(self, written, total):
+        self.rows_written = written
+        self.total_rows = total
+
+    def run(self):
+        # sqlite3 connections are bound to their thread, so the job reads
+        # through a handler of its own. It is read-only, so it neither
+        # migrates the schema nor takes a write lock from the app
+        handler = FinanceDataHandler(self.db_path, read_only=True)
+        try:
+            exporter = TransactionExporter(handler, self.chunk_size)
+            self.result = exporter.export(self.filename, progress=self._progress, **self.options)
+        except Exception as e:
+            self.error = e
+        finally:
+            handler.close()
+            self.done = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export transactions to CSV, gzip CSV, Parquet or Arrow")
+    parser.add_argument("filename", help="output file; the format follows the extension")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="override the format inferred from the extension")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--start", help="first date to export (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last date to export (YYYY-MM-DD)")
+    parser.add_argument("--type", action="append", dest="types", choices=["income", "expense", "saving"],
+                        help="transaction type to export (repeatable)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows fetched per chunk")
+    args = parser.parse_args(argv)
+
+    with FinanceDataHandler(args.db) as handler:
+        exporter = TransactionExporter(handler, args.chunk_size)
+        try:
+            path = exporter.export(args.filename, args.format, args.start, args.end, args.types)
+        except (ExportError, OSError) as e:
+            print(f"Export failed: {e}", file=sys.stderr)
+            return 1
+    print(f"Data exported to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from db_setup import DEFAULT_DB_PATH
+
+TRANSACTION_TYPES = ("income", "expense", "saving")
+DEFAULT_CATEGORY = "Uncategorized"
+DEFAULT_BATCH_SIZE = 10000
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%Y%m%d")
+
+# Header aliases accepted in CSV statements, mapped to our column names
+CSV_COLUMNS = {
+    "date": "date", "posted": "date", "transaction date": "date",
+    "amount": "amount", "value": "amount",
+    "category": "category",
+    "description": "description", "memo": "description", "payee": "description", "name": "description",
+    "transaction_type": "transaction_type", "type": "transaction_type",
+}
+
+_OFX_TAG_RE = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementError(ValueError):
+    pass
+
+
+def parse_date(value):
+    value = value.strip()
+    # OFX timestamps look like 20250105120000[-5:EST]
+    if len(value) > 8 and value[:8].isdigit():
+        value = value[:8]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise StatementError(f"unrecognised date {value!r}")
+
+
+def parse_amount(value):
+    value = value.strip().replace(",", "").replace("$", "")
+    if value.startswith("(") and value.endswith(")"):
+        value = "-" + value[1:-1]
+    try:
+        return float(value)
+    except ValueError:
+        raise StatementError(f"invalid amount {value!r}")
+
+
+def read_csv_rows(stream):
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [CSV_COLUMNS.get(name.strip().lower()) for name in header]
+    if "date" not in columns or "amount" not in columns:
+        raise StatementError("CSV needs at least 'date' and 'amount' columns")
+    for values in reader:
+        if not values:
+            continue
+        yield {column: value for column, value in zip(columns, values) if column}
+
+
+def _iter_ofx_tags(stream, chunk_size=1 << 16):
+    # OFX is often a single huge line, so tokenize fixed-size chunks and keep
+    # any partial tag at the end of a chunk for the next round
+    buffer = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        if chunk:
+            cut = buffer.rfind("<")
+            if cut <= 0:
+                continue
+            text, buffer = buffer[:cut], buffer[cut:]
+        else:
+            text, buffer = buffer, ""
+        for match in _OFX_TAG_RE.finditer(text):
+            yield match.group(1).upper(), match.group(2).strip()
+        if not chunk:
+            break
+
+
+def read_ofx_rows(stream):
+    record = None
+    for tag, value in _iter_ofx_tags(stream):
+        if tag == "STMTTRN":
+            record = {}
+        elif tag == "/STMTTRN":
+            if record is not None:
+                yield record
+            record = None
+        elif record is not None and value:
+            if tag == "DTPOSTED":
+                record["date"] = value
+            elif tag == "TRNAMT":
+                record["amount"] = value
+            elif tag == "NAME":
+                record["description"] = value
+            elif tag == "MEMO":
+                record.setdefault("description", value)
+
+
+def read_qif_rows(stream):
+    record = {}
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield record
+            record = {}
+        elif code == "D":
+            # Quicken writes dates like 1/ 5'25
+            record["date"] = value.replace(" ", "0").replace("'", "/20")
+        elif code in ("T", "U"):
+            record["amount"] = value
+        elif code == "P":
+            record["description"] = value
+        elif code == "M":
+            record.setdefault("description", value)
+        elif code == "L":
+            record["category"] = value.strip("[]")
+    if record:
+        yield record
+
+
+READERS = {
+    "csv": read_csv_rows,
+    "ofx": read_ofx_rows,
+    "qfx": read_ofx_rows,
+    "qif": read_qif_rows,
+}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension not in READERS:
+        raise StatementError(f"cannot infer statement format from {path!r}")
+    return extension
+
+
+def load_category_map(path):
+    """Read a two-column CSV of (source text, category) pairs"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {source.strip().lower(): category.strip()
+                for source, category in csv.reader(f) if source.strip()}
+
+
+class StatementImporter:
+    def __init__(self, data_handler, category_map=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.data_handler = data_handler
+        self.category_map = {key.lower(): value for key, value in (category_map or {}).items()}
+        self.batch_size = batch_size
+        self.skipped = 0
+        self.errors = []
+
+    def map_category(self, category, description):
+        if category:
+            return self.category_map.get(category.lower(), category)
+        # No category in the statement: fall back to payee keywords
+        text = (description or "").lower()
+        for keyword, mapped in self.category_map.items():
+            if keyword in text:
+                return mapped
+        return DEFAULT_CATEGORY
+
+    def normalize(self, record):
+        date = parse_date(record.get("date") or "")
+        amount = parse_amount(record.get("amount") or "")
+        transaction_type = (record.get("transaction_type") or "").strip().lower()
+        if not transaction_type:
+            # Signed bank amounts: money out is an expense, money in is income
+            transaction_type = "expense" if amount < 0 else "income"
+        if transaction_type not in TRANSACTION_TYPES:
+            raise StatementError(f"unknown transaction type {transaction_type!r}")
+        amount = abs(amount)
+        if amount == 0:
+            raise StatementError("zero amount")
+        description = (record.get("description") or "").strip()
+        category = self.map_category((record.get("category") or "").strip(), description)
+        return date, amount, category, description, transaction_type
+
+    def iter_valid_rows(self, records):
+        for line, record in enumerate(records, 1):
+            try:
+                yield self.normalize(record)
+            except StatementError as e:
+                self.skipped += 1
+                if len(self.errors) < 20:
+                    self.errors.append(f"record {line}: {e}")
+
+    def import_stream(self, stream, fmt):
+        rows = self.iter_valid_rows(READERS[fmt](stream))
+        return self.data_handler.import_transactions(rows, batch_size=self.batch_size)
+
+    def import_file(self, path, fmt=None):
+        fmt = fmt or detect_format(path)
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as stream:
+            return self.import_stream(stream, fmt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import bank statements into the finance database")
+    parser.add_argument("files", nargs="+", help="CSV, OFX/QFX or QIF statement files")
+    parser.add_argument("--format", choices=sorted(READERS), help="statement format (default: from file extension)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--category-map", help="CSV of 'source,category' pairs used to map categories")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per INSERT batch")
+    args = parser.parse_args(argv)
+
+    from data_handler import FinanceDataHandler
+
+    category_map = load_category_map(args.category_map) if args.category_map else None
+    handler = FinanceDataHandler(args.db)
+    importer = StatementImporter(handler, category_map, args.batch_size)
+
+    start = time.perf_counter()
+    imported = 0
+    try:
+        for path in args.files:
+            count = importer.import_file(path, args.format)
+            print(f"{path}: {count} rows imported")
+            imported += count
+    except (StatementError, OSError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        handler.close()
+    elapsed = time.perf_counter() - start
+
+    for error in importer.errors:
+        print(f"Skipped {error}", file=sys.stderr)
+    rate = imported / elapsed if elapsed > 0 else float("inf")
+    print(f"Imported {imported} rows ({importer.skipped} skipped) in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
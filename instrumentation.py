@@ -0,0 +1,109 @@
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class Metric:
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.recent.append(ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": percentile(recent, 50),
+            "p95_ms": percentile(recent, 95),
+            "p99_ms": percentile(recent, 99),
+        }
+
+
+class Metrics:
+    """Process-wide latency registry: per-name histograms plus a window of recent samples"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.enabled = True
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(self.window)
+            metric.add(ms)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def timed(self, name):
+        """Decorator recording each call of the wrapped function under `name`"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter() - start) * 1000)
+            return wrapper
+        return decorator
+
+    def summary(self, prefix=""):
+        with self.lock:
+            return {name: metric.summary() for name, metric in sorted(self.metrics.items())
+                    if name.startswith(prefix)}
+
+    def dump(self, path, caches=None):
+        """Write every histogram as JSON, with `caches` (name: LRUCache.stats()) alongside"""
+        with self.lock:
+            data = {
+                "buckets_ms": BUCKETS_MS + ["inf"],
+                "metrics": {name: dict(metric.summary(), histogram=list(metric.buckets))
+                            for name, metric in sorted(self.metrics.items())},
+            }
+        if caches:
+            data["caches"] = caches
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.metrics.clear()
+
+
+metrics = Metrics()
@@ -1,13 +1,23 @@
 import pygame
 import pygame.freetype
+import numpy as np
+import argparse
 import sys
+import time
+from collections import deque
 from datetime import datetime
 import os
 
 # Import our modules
-from db_setup import create_database
+from budgets import BudgetMonitor
+from db_setup import DEFAULT_DB_PATH, create_database
 from data_handler import FinanceDataHandler
-from visualizer import FinanceVisualizer
+from exporter import ExportJob
+from cache import LRUCache, MISSING
+from chart_worker import CHART_BACKENDS, CHART_TYPES, ChartWorker
+from chart_viewport import ChartViewport
+from instrumentation import metrics
+from write_journal import DEFAULT_WRITE_POLICY, parse_policy
 
 # Initialize pygame
 pygame.init()
@@ -25,13 +35,77 @@ BLUE = (0, 0, 200)
 LIGHT_BLUE = (100, 100, 255)
 LIGHT_GREEN = (144, 238, 144)  # Light green for main screen
 LIGHT_PURPLE = (221, 160, 221)  # Light purple for charts screen
+AMBER = (200, 120, 0)
+
+CURSOR_BLINK_MS = 500
+SPINNER_FRAME_MS = 33
+EXPORT_POLL_MS = 100
+HUD_REFRESH_MS = 250
+# Charts are rendered at this multiple of their normal size so zooming in stays sharp
+CHART_RESOLUTION = 2.0
+CHART_TOP = 150
+CHART_READY = pygame.USEREVENT + 1  # Posted by worker threads to wake the idle loop
+# Deletes the view's Undo button can take back
+UNDO_DEPTH = 20
+# Add-transaction choices; anything but "Once" saves a recurring rule of that frequency
+REPEAT_OPTIONS = ["Once", "Daily", "Weekly", "Monthly", "Yearly"]
+
+# Per-screen background: base color for the top half and the amount added
+# (clamped to 255) for the bottom half
+BACKGROUND_GRADIENTS = {
+    "main": ((144, 238, 144), (111, 17, 111)),  # Light green to white
+    "add_transaction": ((100, 100, 255), (155, 155, 0)),  # Light blue
+    "view_transactions": ((230, 230, 230), (25, 25, 25)),  # Light gray
+    "charts": ((221, 160, 221), (34, 95, 34)),  # Light purple
+}
+
+# System font lookups (an fc-list scan on Linux) resolved per (name, bold),
+# and loaded fonts shared per (path, size, bold)
+font_paths = {}
+font_cache = {}
+
+def font_path(name, bold=False):
+    key = (name, bold)
+    if key not in font_paths:
+        font_paths[key] = pygame.font.match_font(name, bold=bold)
+    return font_paths[key]
+
+def load_font(name, size, bold=False):
+    path = font_path(name, bold)
+    key = (path, size, bold)
+    font = font_cache.get(key)
+    if font is None:
+        # A None path is pygame's bundled default font
+        font = pygame.freetype.Font(path, size)
+        # No separate bold face installed: embolden the regular one
+        font.strong = bold and (path is None or path == font_path(name))
+        font_cache[key] = font
+    return font
 
 # Load fonts
 pygame.freetype.init()
-font_small = pygame.freetype.SysFont("Arial", 16)
-font_medium = pygame.freetype.SysFont("Arial", 20)
-font_large = pygame.freetype.SysFont("Arial", 24)
-font_title = pygame.freetype.SysFont("Arial", 32, bold=True)
+font_small = load_font("Arial", 16)
+font_medium = load_font("Arial", 20)
+font_large = load_font("Arial", 24)
+font_title = load_font("Arial", 32, bold=True)
+
+# Rendered text surfaces keyed by (font, text, color); labels rarely change
+text_cache = LRUCache(1024)
+
+def render_text(font, text, color):
+    key = (id(font), text, color)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface, _ = font.render(text, color)
+        text_cache.put(key, surface)
+    return surface
+
+def blit_text(screen, font, pos, text, color):
+    return screen.blit(render_text(font, text, color), pos)
+
+def transaction_key(transaction):
+    """The (date, id) key the transactions view pages by"""
+    return transaction['date'], transaction['id']
 
 class Button:
     def __init__(self, x, y, width, height, text, color=GRAY, hover_color=LIGHT_BLUE, text_color=BLACK):
@@ -41,18 +115,32 @@ class Button:
         self.hover_color = hover_color
         self.text_color = text_color
         self.is_hovered = False
+        self.dirty = True
+        self.surfaces = {}
+
+    def render(self, hovered):
+        # Whole button (face, border and label) for one hover state
+        key = (hovered, self.text)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            local_rect = surface.get_rect()
+            pygame.draw.rect(surface, self.hover_color if hovered else self.color, local_rect, border_radius=5)
+            pygame.draw.rect(surface, DARK_GRAY, local_rect, 2, border_radius=5)
+            text_surf = render_text(font_medium, self.text, self.text_color)
+            surface.blit(text_surf, text_surf.get_rect(center=local_rect.center))
+            self.surfaces[key] = surface
+        return surface
         
     def draw(self, screen):
-        color = self.hover_color if self.is_hovered else self.color
-        pygame.draw.rect(screen, color, self.rect, border_radius=5)
-        pygame.draw.rect(screen, DARK_GRAY, self.rect, 2, border_radius=5)
-        
-        text_surf, text_rect = font_medium.render(self.text, self.text_color)
-        text_rect.center = self.rect.center
-        screen.blit(text_surf, text_rect)
+        screen.blit(self.render(self.is_hovered), self.rect)
+        self.dirty = False
         
     def update(self, mouse_pos):
-        self.is_hovered = self.rect.collidepoint(mouse_pos)
+        hovered = self.rect.collidepoint(mouse_pos)
+        if hovered != self.is_hovered:
+            self.is_hovered = hovered
+            self.dirty = True
         
     def is_clicked(self, mouse_pos, mouse_click):
         return self.rect.collidepoint(mouse_pos) and mouse_click
@@ -64,7 +152,8 @@ class TextInput:
         self.placeholder = placeholder
         self.active = False
         self.cursor_visible = True
-        self.cursor_timer = 0
+        self.cursor_timer = pygame.time.get_ticks()
+        self.dirty = True
         
     def draw(self, screen):
         color = LIGHT_GRAY if self.active else WHITE
@@ -72,11 +161,15 @@ class TextInput:
         pygame.draw.rect(screen, DARK_GRAY, self.rect, 2, border_radius=5)
         
         if self.text:
-            text_surf, text_rect = font_medium.render(self.text, BLACK)
+            text_surf = render_text(font_medium, self.text, BLACK)
         else:
-            text_surf, text_rect = font_medium.render(self.placeholder, DARK_GRAY)
+            text_surf = render_text(font_medium, self.placeholder, DARK_GRAY)
         
+        text_rect = text_surf.get_rect()
         text_rect.topleft = (self.rect.x + 10, self.rect.y + (self.rect.height - text_rect.height) // 2)
+        # Keep long text inside the box so partial redraws leave no trails
+        previous_clip = screen.get_clip()
+        screen.set_clip(self.rect)
         screen.blit(text_surf, text_rect)
         
         if self.active and self.cursor_visible:
@@ -85,16 +178,28 @@ class TextInput:
             else:
                 cursor_x = self.rect.x + 10
             pygame.draw.line(screen, BLACK, (cursor_x, self.rect.y + 5), (cursor_x, self.rect.y + self.rect.height - 5), 2)
+        screen.set_clip(previous_clip)
+        self.dirty = False
     
+    def next_blink_ms(self):
+        """Milliseconds until the cursor should blink, or None when inactive"""
+        if not self.active:
+            return None
+        return max(0, self.cursor_timer + CURSOR_BLINK_MS - pygame.time.get_ticks())
+
     def update(self, events):
-        self.cursor_timer += 1
-        if self.cursor_timer >= 30:
+        now = pygame.time.get_ticks()
+        if now - self.cursor_timer >= CURSOR_BLINK_MS:
             self.cursor_visible = not self.cursor_visible
-            self.cursor_timer = 0
+            self.cursor_timer = now
+            self.dirty = self.dirty or self.active
             
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
-                self.active = self.rect.collidepoint(event.pos)
+                active = self.rect.collidepoint(event.pos)
+                if active != self.active:
+                    self.active = active
+                    self.dirty = True
             
             if event.type == pygame.KEYDOWN and self.active:
                 if event.key == pygame.K_BACKSPACE:
@@ -103,6 +208,7 @@ class TextInput:
                     self.active = False
                 else:
                     self.text += event.unicode
+                self.dirty = True
 
 class Dropdown:
     def __init__(self, x, y, width, height, options):
@@ -111,12 +217,14 @@ class Dropdown:
         self.active = False
         self.selected = options[0] if options else ""
         self.dropdown_rect = pygame.Rect(x, y + height, width, height * len(options))
+        self.dirty = True
         
     def draw(self, screen):
         pygame.draw.rect(screen, WHITE, self.rect, border_radius=5)
         pygame.draw.rect(screen, DARK_GRAY, self.rect, 2, border_radius=5)
         
-        text_surf, text_rect = font_medium.render(self.selected, BLACK)
+        text_surf = render_text(font_medium, self.selected, BLACK)
+        text_rect = text_surf.get_rect()
         text_rect.topleft = (self.rect.x + 10, self.rect.y + (self.rect.height - text_rect.height) // 2)
         screen.blit(text_surf, text_rect)
         
@@ -133,16 +241,20 @@ class Dropdown:
                 pygame.draw.rect(screen, WHITE, option_rect)
                 pygame.draw.rect(screen, DARK_GRAY, option_rect, 1)
                 
-                text_surf, text_rect = font_medium.render(option, BLACK)
+                text_surf = render_text(font_medium, option, BLACK)
+                text_rect = text_surf.get_rect()
                 text_rect.topleft = (option_rect.x + 10, option_rect.y + (option_rect.height - text_rect.height) // 2)
                 screen.blit(text_surf, text_rect)
+        self.dirty = False
     
     def update(self, events, mouse_pos):
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if self.rect.collidepoint(mouse_pos):
                     self.active = not self.active
+                    self.dirty = True
                 elif self.active:
+                    self.dirty = True
                     for i, option in enumerate(self.options):
                         option_rect = pygame.Rect(self.rect.x, self.rect.y + self.rect.height + i * self.rect.height, 
                                                 self.rect.width, self.rect.height)
@@ -154,34 +266,239 @@ class Dropdown:
         return False
 
 class FinanceTrackerApp:
-    def __init__(self):
-        create_database()
-        self.data_handler = FinanceDataHandler()
-        self.visualizer = FinanceVisualizer(self.data_handler)
+    def __init__(self, max_fps=60, idle_wait=True, metrics_dump=None, db_path=DEFAULT_DB_PATH,
+                 chart_backend="native", chart_backends=None, write_policy=DEFAULT_WRITE_POLICY,
+                 project_recurring=False):
+        if not os.path.exists(db_path):
+            create_database(db_path)
+        # Adds and deletes are committed in groups on a writer thread;
+        # shutdown() flushes them through data_handler.close()
+        self.data_handler = FinanceDataHandler(db_path, write_policy=write_policy)
+        # Catch up on recurring transactions due since the last run, in one commit
+        self.data_handler.materialize_recurring()
+        # Running month-to-date totals, shown as alerts on the main screen.
+        # Listens first, so its totals have moved by the time queue_change() wakes the loop
+        self.budget_monitor = BudgetMonitor(self.data_handler)
+        # Committed writes, queued by the handler and folded into the view by apply_changes()
+        self.pending_changes = deque()
+        self.data_handler.add_listener(self.queue_change)
+        # Lists of deleted rows, newest last, for undo_delete()
+        self.undo_stack = []
         self.current_screen = "main"
-        self.transactions = []
+        self.page_transactions = []
+        self.delete_buttons = []
+        self.transaction_count = 0
         self.categories = []
         self.current_year = str(datetime.now().year)
         self.chart_type = "pie_expense"
         self.current_chart_surface = None
-        self.zoom_scale = 1.0
+        # Charts are several MB each at CHART_RESOLUTION
+        self.chart_cache = LRUCache(8)
+        # Started once the first frame is up; see start_chart_worker()
+        self.chart_worker = ChartWorker(self.data_handler.db_path, on_result=self.wake, scale=CHART_RESOLUTION,
+                                        projected=project_recurring)
+        # Renderer for every chart type, overridden per type by chart_backends
+        self.chart_backend = chart_backend
+        self.chart_backends = dict(chart_backends or {})
+        self.chart_pending_key = None
+        self.chart_submitted_at = None
+        self.chart_viewport = ChartViewport((0, CHART_TOP, WIDTH, HEIGHT - CHART_TOP), CHART_RESOLUTION)
         self.fullscreen = False
+        self.max_fps = max_fps
+        # Block on the event queue between updates instead of polling at max_fps
+        self.idle_wait = idle_wait
+        self.background_cache = {}
+        # Steady-state frames only push the rectangles of widgets that changed
+        self.dirty_rect_updates = True
+        self.full_redraw = True
+        self.redraw_requested = True
+        self.last_scene = None
+        self.dirty_rects = []
+        self.export_job = None
+        self.status_message = ""
+        # Latency overlay toggled with F3; histograms are written on exit
+        self.show_hud = False
+        self.hud_surface = None
+        self.hud_updated_ms = 0
+        self.metrics_dump = metrics_dump
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Personal Finance Tracker")
         self.load_data()
         self.init_ui()
         
     def load_data(self):
-        transactions_df = self.data_handler.get_all_transactions()
-        self.transactions = transactions_df.to_dict('records') if not transactions_df.empty else []
-        categories_df = self.data_handler.get_all_categories()
-        self.categories = categories_df.to_dict('records') if not categories_df.empty else []
+        self.categories = self.data_handler.list_categories()
         self.income_categories = [cat['name'] for cat in self.categories if cat['type'] == 'income']
         self.expense_categories = [cat['name'] for cat in self.categories if cat['type'] == 'expense']
         self.saving_categories = [cat['name'] for cat in self.categories if cat['type'] == 'saving']
         if not self.income_categories: self.income_categories = ['Salary']
         if not self.expense_categories: self.expense_categories = ['Groceries']
         if not self.saving_categories: self.saving_categories = ['Savings']
+
+    def open_transactions_view(self):
+        self.search = None
+        self.search_message = ""
+        for search_input in self.search_inputs:
+            search_input.text = ""
+        self.transaction_page = 0
+        self.page_after = None
+        self.transaction_count = self.data_handler.count_transactions()
+        self.set_page_transactions(self.data_handler.get_transactions_page(self.transactions_per_page))
+        # The count above already includes every queued change
+        self.pending_changes.clear()
+
+    def next_transactions_page(self):
+        if self.search:
+            self.transaction_page += 1
+            self.load_search_page()
+            return
+        last = transaction_key(self.page_transactions[-1])
+        rows = self.data_handler.get_transactions_page(self.transactions_per_page, after=last)
+        if rows:
+            self.transaction_page += 1
+            self.page_after = last
+            self.set_page_transactions(rows)
+
+    def previous_transactions_page(self):
+        if self.search:
+            self.transaction_page -= 1
+            self.load_search_page()
+            return
+        if self.page_after is not None:
+            self.show_previous_page()
+
+    def show_previous_page(self):
+        """Step back to the page that ends with the page_after row"""
+        # One row more than a page also gives the key that page starts after
+        rows = self.data_handler.get_transactions_page(
+            self.transactions_per_page + 1, before=self.page_after, inclusive=True)
+        self.page_after = transaction_key(rows.pop(0)) if len(rows) > self.transactions_per_page else None
+        self.transaction_page = self.transaction_page - 1 if self.page_after is not None else 0
+        self.set_page_transactions(rows)
+
+    def reload_transactions_page(self):
+        # Every path re-counts, which already includes every queued change
+        self.pending_changes.clear()
+        if self.search:
+            self.transaction_count = self.data_handler.count_search_results(*self.search)
+            last_page = max(0, (self.transaction_count - 1) // self.transactions_per_page)
+            self.transaction_page = min(self.transaction_page, last_page)
+            self.load_search_page()
+            return
+        # Re-read the page from where it starts so deletes don't reset the view
+        self.transaction_count = self.data_handler.count_transactions()
+        rows = self.data_handler.get_transactions_page(self.transactions_per_page, after=self.page_after)
+        if rows or self.page_after is None:
+            self.set_page_transactions(rows)
+        else:
+            self.show_previous_page()
+
+    def run_search(self):
+        text = self.search_input.text.strip()
+        start_date = self.search_from_input.text.strip() or None
+        end_date = self.search_to_input.text.strip() or None
+        transaction_types = [self.search_type] if self.search_type else None
+        if not (text or start_date or end_date or transaction_types):
+            self.open_transactions_view()
+            return
+        try:
+            for value in (start_date, end_date):
+                if value:
+                    datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            self.search_message = "Dates must be YYYY-MM-DD"
+            self.invalidate()
+            return
+        self.search = (text, start_date, end_date, transaction_types)
+        self.search_message = ""
+        self.transaction_page = 0
+        self.transaction_count = self.data_handler.count_search_results(*self.search)
+        self.pending_changes.clear()
+        self.load_search_page()
+
+    def load_search_page(self):
+        text, start_date, end_date, transaction_types = self.search
+        rows = self.data_handler.search_transactions(
+            text, self.transactions_per_page, self.transaction_page * self.transactions_per_page,
+            start_date, end_date, transaction_types)
+        self.set_page_transactions(rows)
+
+    def cycle_search_type(self):
+        types = [None, "income", "expense", "saving"]
+        self.search_type = types[(types.index(self.search_type) + 1) % len(types)]
+        self.search_type_button.text = self.search_type.capitalize() if self.search_type else "All types"
+        self.search_type_button.dirty = True
+
+    def queue_change(self, change):
+        # Called on whichever thread committed the change
+        self.pending_changes.append(change)
+        self.wake()
+
+    def apply_changes(self):
+        """Fold committed inserts, updates and deletes into the transactions view"""
+        changes = []
+        while self.pending_changes:
+            changes.append(self.pending_changes.popleft())
+        # Other screens hold no transaction rows; the view re-reads them when opened
+        if not changes or self.current_screen != "view_transactions":
+            return
+        if any(change.kind == "reset" for change in changes):
+            self.reload_transactions_page()
+        elif self.search:
+            self.apply_search_changes(changes)
+        elif not self.page_transactions:
+            self.reload_transactions_page()
+        else:
+            self.apply_page_changes(changes)
+
+    def apply_page_changes(self, changes):
+        # The page holds the rows after page_after in (date, id) order, up to
+        # its last row when full: changed rows in that range join it, and a
+        # page left short is refilled from the rows that follow
+        page_size = self.transactions_per_page
+        rows = self.page_transactions
+        last_key = transaction_key(rows[-1])
+        full = len(rows) == page_size
+        for change in changes:
+            if change.kind == "inserted":
+                self.transaction_count += len(change.ids)
+            elif change.kind == "deleted":
+                self.transaction_count -= len(change.ids)
+            removed = set(change.ids)
+            rows = [row for row in rows if row['id'] not in removed]
+            if change.kind == "deleted":
+                continue
+            for row in change.rows:
+                key = transaction_key(row)
+                if (self.page_after is None or key > self.page_after) and (key <= last_key or not full):
+                    rows.append(row)
+        rows = sorted(rows, key=transaction_key)[:page_size]
+        if full and len(rows) < page_size:
+            rows += self.data_handler.get_transactions_page(
+                page_size - len(rows), after=transaction_key(rows[-1]) if rows else self.page_after)
+        if rows or self.page_after is None:
+            self.set_page_transactions(rows)
+        else:
+            self.show_previous_page()
+
+    def apply_search_changes(self, changes):
+        # Whether a new or edited row matches the search only the database knows
+        if any(change.kind != "deleted" for change in changes):
+            self.reload_transactions_page()
+            return
+        # Rows are only deleted from this screen, so every deleted match was on it
+        removed = {transaction_id for change in changes for transaction_id in change.ids}
+        self.transaction_count -= sum(row['id'] in removed for row in self.page_transactions)
+        last_page = max(0, (self.transaction_count - 1) // self.transactions_per_page)
+        self.transaction_page = min(self.transaction_page, last_page)
+        self.load_search_page()
+
+    def set_page_transactions(self, rows):
+        self.page_transactions = rows
+        # One persistent Delete button per visible row, rebuilt only when the page changes
+        self.delete_buttons = [(Button(900, 150 + i * 50 - 10, 80, 30, "Delete", RED), transaction)
+                               for i, transaction in enumerate(rows)]
+        self.invalidate()
     
     def init_ui(self):
         self.main_buttons = [
@@ -196,16 +513,34 @@ class FinanceTrackerApp:
         self.description_input = TextInput(400, 250, 400, 40, "Description")
         self.transaction_type_dropdown = Dropdown(400, 300, 200, 40, ["Income", "Expense", "Saving"])
         self.category_dropdown = Dropdown(400, 350, 200, 40, self.income_categories)
+        self.repeat_dropdown = Dropdown(780, 300, 150, 40, REPEAT_OPTIONS)
         self.add_transaction_buttons = [
             Button(400, 450, 150, 50, "Save", GREEN),
             Button(600, 450, 150, 50, "Cancel", RED)
         ]
         self.transaction_page = 0
+        # (date, id) key of the row before the page; None on the first page
+        self.page_after = None
         self.transactions_per_page = 10
+        self.search = None
+        self.search_message = ""
+        self.search_type = None
+        self.search_input = TextInput(50, 50, 300, 36, "Search description or category")
+        self.search_from_input = TextInput(370, 50, 140, 36, "From date")
+        self.search_to_input = TextInput(520, 50, 140, 36, "To date")
+        self.search_inputs = [self.search_input, self.search_from_input, self.search_to_input]
+        self.search_type_button = Button(680, 50, 120, 36, "All types")
+        self.search_buttons = [
+            self.search_type_button,
+            Button(820, 50, 100, 36, "Search", GREEN),
+            Button(930, 50, 100, 36, "Clear", GRAY)
+        ]
         self.view_transactions_buttons = [
+            Button(100, 700, 150, 50, "Undo", GRAY),
             Button(300, 700, 150, 50, "Previous", BLUE),
             Button(500, 700, 150, 50, "Next", BLUE),
-            Button(700, 700, 150, 50, "Back", RED)
+            Button(700, 700, 150, 50, "Back", RED),
+            Button(900, 700, 150, 50, "Delete page", RED)
         ]
         self.chart_buttons = [
             Button(50, 150, 200, 40, "Expense Pie Chart", BLUE),
@@ -224,16 +559,21 @@ class FinanceTrackerApp:
         running = True
         
         while running:
+            events = self.wait_for_events()
+            frame_start = time.perf_counter()
             mouse_pos = pygame.mouse.get_pos()
             mouse_clicked = False
-            events = []
             
-            for event in pygame.event.get():
-                events.append(event)
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     mouse_clicked = True
+                if self.current_screen == "charts" and self.pan_chart(event):
+                    self.invalidate()
+                if event.type == pygame.VIDEORESIZE:
+                    self.background_cache.clear()
+                    self.invalidate()
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_f:
                         self.fullscreen = not self.fullscreen
@@ -241,94 +581,225 @@ class FinanceTrackerApp:
                             self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
                         else:
                             self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+                        self.background_cache.clear()
+                        self.invalidate()
+                    elif event.key == pygame.K_F3:
+                        self.show_hud = not self.show_hud
+                        self.hud_surface = None
+                        self.invalidate()
                     elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
-                        self.zoom_scale = min(2.0, self.zoom_scale + 0.1)
-                        self.generate_chart()
+                        # Served from the viewport's scaled levels; nothing is re-rendered
+                        if self.chart_viewport.zoom_by(1):
+                            self.invalidate()
                     elif event.key == pygame.K_MINUS:
-                        self.zoom_scale = max(0.5, self.zoom_scale - 0.1)
-                        self.generate_chart()
+                        if self.chart_viewport.zoom_by(-1):
+                            self.invalidate()
+                    elif (event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL
+                          and self.current_screen == "view_transactions"
+                          and not any(search_input.active for search_input in self.search_inputs)):
+                        self.undo_delete()
             
-            # Draw background based on current screen
-            self.draw_background()
+            # Recurring transactions that came due since the last frame, e.g. after
+            # midnight, are written here so the view and budgets get them as changes
+            self.data_handler.ensure_recurring()
+            self.apply_changes()
+            self.begin_frame()
             
             if self.current_screen == "main":
                 self.handle_main_screen(mouse_pos, mouse_clicked)
             elif self.current_screen == "add_transaction":
                 self.handle_add_transaction_screen(events, mouse_pos, mouse_clicked)
             elif self.current_screen == "view_transactions":
-                self.handle_view_transactions_screen(mouse_pos, mouse_clicked)
+                self.handle_view_transactions_screen(events, mouse_pos, mouse_clicked)
             elif self.current_screen == "charts":
                 self.handle_charts_screen(events, mouse_pos, mouse_clicked)
             
-            pygame.display.flip()
-            clock.tick(60)
+            self.present()
+            metrics.record("frame", (time.perf_counter() - frame_start) * 1000)
+            self.start_chart_worker()
+            clock.tick(self.max_fps)
         
+        self.shutdown()
+
+    def shutdown(self):
+        self.chart_worker.stop()
+        # Let the worker close its own connection before ours goes
+        if self.chart_worker.ident is not None:
+            self.chart_worker.join(timeout=1.0)
+        self.data_handler.close()
+        if self.metrics_dump:
+            metrics.dump(self.metrics_dump, self.cache_stats())
         pygame.quit()
         sys.exit()
     
-    def draw_background(self):
-        if self.current_screen == "main":
-            # Light green gradient
-            for y in range(HEIGHT):
-                r = max(144, min(255, 144 + (y * 2 // HEIGHT) * 111))  # Gradient from light green to white
-                g = max(238, min(255, 238 + (y * 2 // HEIGHT) * 17))
-                b = max(144, min(255, 144 + (y * 2 // HEIGHT) * 111))
-                pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
-            # Optional: Uncomment to use an image
-            # background = pygame.image.load("main_background.png").convert()
-            # background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-            # self.screen.blit(background, (0, 0))
+    def start_chart_worker(self):
+        # The worker imports matplotlib and pandas as it starts, so deferring
+        # it until the menu is on screen pre-warms charts without delaying it
+        if self.chart_worker.ident is None:
+            self.chart_worker.start()
+
+    def wake(self):
+        # Called from worker threads; SDL's event queue is thread-safe
+        pygame.event.post(pygame.event.Event(CHART_READY))
+
+    def next_timer_ms(self):
+        """How long the loop may sleep before something on screen must change"""
+        if self.redraw_requested or self.scene_key() != self.last_scene:
+            return 0
+        timers = []
+        if self.current_screen == "charts":
+            if self.chart_pending_key is not None:
+                timers.append(SPINNER_FRAME_MS)
+            inputs = [self.year_input]
         elif self.current_screen == "add_transaction":
-            # Light blue gradient
-            for y in range(HEIGHT):
-                r = max(100, min(255, 100 + (y * 2 // HEIGHT) * 155))
-                g = max(100, min(255, 100 + (y * 2 // HEIGHT) * 155))
-                b = max(255, min(255, 255 + (y * 2 // HEIGHT) * 0))
-                pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
-            # Optional: Uncomment to use an image
-            # background = pygame.image.load("add_transaction_background.png").convert()
-            # background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-            # self.screen.blit(background, (0, 0))
+            inputs = [self.date_input, self.amount_input, self.description_input]
         elif self.current_screen == "view_transactions":
-            # Light gray gradient with subtle pattern
-            for y in range(HEIGHT):
-                r = max(230, min(255, 230 + (y * 2 // HEIGHT) * 25))
-                g = max(230, min(255, 230 + (y * 2 // HEIGHT) * 25))
-                b = max(230, min(255, 230 + (y * 2 // HEIGHT) * 25))
-                pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
-            # Optional subtle lines for pattern
-            for x in range(0, WIDTH, 50):
-                pygame.draw.line(self.screen, (220, 220, 220), (x, 0), (x, HEIGHT), 1)
-            # Optional: Uncomment to use an image
-            # background = pygame.image.load("view_transactions_background.png").convert()
-            # background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-            # self.screen.blit(background, (0, 0))
-        elif self.current_screen == "charts":
-            # Light purple gradient
-            for y in range(HEIGHT):
-                r = max(221, min(255, 221 + (y * 2 // HEIGHT) * 34))
-                g = max(160, min(255, 160 + (y * 2 // HEIGHT) * 95))
-                b = max(221, min(255, 221 + (y * 2 // HEIGHT) * 34))
-                pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
-            # Optional: Uncomment to use an image
-            # background = pygame.image.load("charts_background.png").convert()
-            # background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-            # self.screen.blit(background, (0, 0))
+            inputs = self.search_inputs
+        else:
+            inputs = []
+        timers.extend(ms for ms in (text_input.next_blink_ms() for text_input in inputs) if ms is not None)
+        if self.export_job is not None:
+            timers.append(EXPORT_POLL_MS)
+        if self.show_hud:
+            timers.append(HUD_REFRESH_MS)
+        return min(timers) if timers else None
+
+    def wait_for_events(self):
+        events = pygame.event.get()
+        if events or not self.idle_wait:
+            return events
+        timeout = self.next_timer_ms()
+        if timeout == 0:
+            return events
+        # Nothing animating: sleep until input, a worker wake-up or the next
+        # timed update (cursor blink, spinner, export progress)
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            events.append(event)
+        events.extend(pygame.event.get())
+        return events
+
+    def invalidate(self):
+        """Repaint the whole screen on the next frame"""
+        self.redraw_requested = True
+
+    def scene_key(self):
+        # State outside the widgets whose change means a full repaint
+        key = (self.current_screen, self.screen.get_size())
+        if self.current_screen == "main":
+            # Alerts change as writes commit, without any input
+            key += (self.status_message, tuple(self.budget_monitor.alerts()))
+        return key
+
+    def begin_frame(self):
+        scene = self.scene_key()
+        dropdown_open = self.current_screen == "add_transaction" and (
+            self.transaction_type_dropdown.active or self.category_dropdown.active or self.repeat_dropdown.active)
+        # Open dropdown lists overlap other widgets, so repaint in full while they show
+        # The overlay is drawn over everything, so it also needs full frames
+        self.full_redraw = (not self.dirty_rect_updates or self.redraw_requested
+                            or scene != self.last_scene or dropdown_open or self.show_hud)
+        self.redraw_requested = False
+        self.last_scene = scene
+        self.dirty_rects = []
+        if self.full_redraw:
+            self.draw_background()
+
+    def present(self):
+        if self.show_hud:
+            self.draw_hud()
+        if self.full_redraw:
+            pygame.display.flip()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+
+    def draw_hud(self):
+        now = pygame.time.get_ticks()
+        if self.hud_surface is None or now - self.hud_updated_ms >= HUD_REFRESH_MS:
+            self.hud_surface = self.render_hud()
+            self.hud_updated_ms = now
+        self.screen.blit(self.hud_surface, (self.screen.get_width() - self.hud_surface.get_width() - 10, 10))
+
+    def cache_stats(self):
+        """LRUCache.stats() of the rendered chart cache and both handlers' summary caches"""
+        caches = {"chart_cache": self.chart_cache, "summary_cache": self.data_handler.summary_cache,
+                  "chart_worker.summary_cache": self.chart_worker.summary_cache}
+        return {name: cache.stats() for name, cache in caches.items() if cache is not None}
+
+    def render_hud(self):
+        summary = metrics.summary()
+        frame = summary.pop("frame", None)
+        lines = []
+        if frame:
+            lines.append(f"frame  p50 {frame['p50_ms']:.1f}  p95 {frame['p95_ms']:.1f}  "
+                         f"p99 {frame['p99_ms']:.1f} ms  (n={frame['count']})")
+        for name, stats in summary.items():
+            lines.append(f"{name}  p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f} ms  (n={stats['count']})")
+        if not lines:
+            lines.append("no samples yet")
+        for name, stats in self.cache_stats().items():
+            lines.append(f"{name}  hit rate {stats['hit_rate']:.0%}  {stats['size']}/{stats['maxsize']}  "
+                         f"(n={stats['hits'] + stats['misses']})")
+        line_height = font_small.get_sized_height() + 2
+        width = max(font_small.get_rect(line).width for line in lines) + 20
+        hud = pygame.Surface((width, line_height * len(lines) + 16), pygame.SRCALPHA)
+        hud.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            font_small.render_to(hud, (10, 8 + i * line_height), line, WHITE)
+        return hud
+
+    def draw_widget(self, widget):
+        if self.full_redraw:
+            widget.draw(self.screen)
+        elif widget.dirty:
+            self.restore_background(widget.rect)
+            widget.draw(self.screen)
+            self.dirty_rects.append(widget.rect.copy())
+
+    def current_background(self):
+        size = self.screen.get_size()
+        key = (self.current_screen, size)
+        background = self.background_cache.get(key)
+        if background is None:
+            background = self.render_background(self.current_screen, size)
+            self.background_cache[key] = background
+        return background
+
+    def draw_background(self):
+        self.screen.blit(self.current_background(), (0, 0))
+
+    def restore_background(self, rect):
+        self.screen.blit(self.current_background(), rect, rect)
+
+    def render_background(self, screen_name, size):
+        # Built once per screen and resolution with array ops, then blitted
+        # each frame instead of drawing one line per row
+        width, height = size
+        base, delta = (np.array(c) for c in BACKGROUND_GRADIENTS[screen_name])
+        step = (np.arange(height) * 2 // height)[:, None]
+        rows = np.clip(base + step * delta, base, 255).astype(np.uint8)
+        pixels = np.repeat(rows[None, :, :], width, axis=0)
+        if screen_name == "view_transactions":
+            # Subtle vertical lines for pattern
+            pixels[::50, :, :] = 220
+        return pygame.surfarray.make_surface(pixels).convert()
 
     def handle_add_transaction_screen(self, events, mouse_pos, mouse_clicked):
-        font_title.render_to(self.screen, (WIDTH//2 - 150, 80), "Add Transaction", BLACK)
-        font_medium.render_to(self.screen, (250, 160), "Date:", BLACK)
-        font_medium.render_to(self.screen, (250, 210), "Amount:", BLACK)
-        font_medium.render_to(self.screen, (250, 260), "Description:", BLACK)
-        font_medium.render_to(self.screen, (250, 310), "Type:", BLACK)
-        font_medium.render_to(self.screen, (250, 360), "Category:", BLACK)
+        if self.full_redraw:
+            blit_text(self.screen, font_title, (WIDTH//2 - 150, 80), "Add Transaction", BLACK)
+            blit_text(self.screen, font_medium, (250, 160), "Date:", BLACK)
+            blit_text(self.screen, font_medium, (250, 210), "Amount:", BLACK)
+            blit_text(self.screen, font_medium, (250, 260), "Description:", BLACK)
+            blit_text(self.screen, font_medium, (250, 310), "Type:", BLACK)
+            blit_text(self.screen, font_medium, (680, 310), "Repeat:", BLACK)
+            blit_text(self.screen, font_medium, (250, 360), "Category:", BLACK)
         
         self.date_input.update(events)
-        self.date_input.draw(self.screen)
+        self.draw_widget(self.date_input)
         self.amount_input.update(events)
-        self.amount_input.draw(self.screen)
+        self.draw_widget(self.amount_input)
         self.description_input.update(events)
-        self.description_input.draw(self.screen)
+        self.draw_widget(self.description_input)
         
         type_changed = self.transaction_type_dropdown.update(events, mouse_pos)
         if type_changed:
@@ -340,10 +811,14 @@ class FinanceTrackerApp:
                 self.category_dropdown = Dropdown(400, 350, 200, 40, self.saving_categories)
         
         self.category_dropdown.update(events, mouse_pos)
+        self.repeat_dropdown.update(events, mouse_pos)
+        if self.transaction_type_dropdown.dirty or self.category_dropdown.dirty or self.repeat_dropdown.dirty:
+            # Opening or closing a list uncovers other widgets
+            self.invalidate()
         
         for button in self.add_transaction_buttons:
             button.update(mouse_pos)
-            button.draw(self.screen)
+            self.draw_widget(button)
             if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
                 if button.text == "Save":
                     self.save_transaction()
@@ -351,33 +826,71 @@ class FinanceTrackerApp:
                     self.current_screen = "main"
         
         if self.transaction_type_dropdown.active:
-            self.category_dropdown.draw(self.screen)
-            self.transaction_type_dropdown.draw(self.screen)
+            self.draw_widget(self.category_dropdown)
+            self.draw_widget(self.transaction_type_dropdown)
         else:
-            self.transaction_type_dropdown.draw(self.screen)
-            self.category_dropdown.draw(self.screen)
+            self.draw_widget(self.transaction_type_dropdown)
+            self.draw_widget(self.category_dropdown)
+        self.draw_widget(self.repeat_dropdown)
     
     def handle_main_screen(self, mouse_pos, mouse_clicked):
-        font_title.render_to(self.screen, (WIDTH//2 - 250, 100), "Personal Finance Tracker", BLACK)
+        self.update_export_status()
+        if self.full_redraw:
+            blit_text(self.screen, font_title, (WIDTH//2 - 250, 100), "Personal Finance Tracker", BLACK)
+            if self.status_message:
+                blit_text(self.screen, font_medium, (WIDTH//2 - 150, 690), self.status_message, BLACK)
+            self.draw_budget_alerts()
         for button in self.main_buttons:
             button.update(mouse_pos)
-            button.draw(self.screen)
+            self.draw_widget(button)
             if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
                 if button.text == "Add Transaction":
                     self.current_screen = "add_transaction"
                 elif button.text == "View Transactions":
                     self.current_screen = "view_transactions"
-                    self.load_data()
+                    self.open_transactions_view()
                 elif button.text == "Charts & Analytics":
                     self.current_screen = "charts"
                     self.generate_chart()
                 elif button.text == "Export Data":
-                    filename = self.data_handler.export_to_csv("finance_data.csv")
-                    print(f"Data exported to {filename}")
+                    self.start_export("finance_data.csv")
                 elif button.text == "Exit":
-                    pygame.quit()
-                    sys.exit()
+                    self.shutdown()
     
+    def draw_budget_alerts(self):
+        alerts = self.budget_monitor.alerts()
+        if not alerts:
+            return
+        blit_text(self.screen, font_medium, (40, 200), "Budget alerts", BLACK)
+        for i, (category, spent, limit, threshold) in enumerate(alerts[:10]):
+            color = RED if threshold >= 1 else AMBER
+            blit_text(self.screen, font_small, (40, 240 + i * 30),
+                      f"{category}: {spent:,.2f} of {limit:,.2f} ({spent / limit:.0%})", color)
+
+    def start_export(self, filename):
+        if self.export_job and not self.export_job.done:
+            return
+        # The job reads through its own connection, so commit queued writes first
+        self.data_handler.flush()
+        # Stream the export on a worker thread so the UI keeps drawing
+        self.export_job = ExportJob(self.data_handler.db_path, filename)
+        self.export_job.start()
+
+    def update_export_status(self):
+        job = self.export_job
+        if job is None:
+            return
+        if not job.done:
+            self.status_message = f"Exporting... {job.fraction:.0%}"
+            return
+        if job.error:
+            self.status_message = "Export failed"
+            print(f"Export failed: {job.error}")
+        else:
+            self.status_message = f"Exported {job.rows_written} rows"
+            print(f"Data exported to {job.result}")
+        self.export_job = None
+
     def save_transaction(self):
         try:
             date_str = self.date_input.text
@@ -390,82 +903,133 @@ class FinanceTrackerApp:
                 print("Please fill all required fields correctly")
                 return
             
-            self.data_handler.add_transaction(date_str, amount, category, description, transaction_type)
+            if self.repeat_dropdown.selected == "Once":
+                self.data_handler.add_transaction(date_str, amount, category, description, transaction_type)
+            else:
+                # Occurrences up to today are written now; later ones as their days come
+                self.data_handler.add_recurring_rule(amount, category, description, transaction_type, date_str,
+                                                     self.repeat_dropdown.selected.lower())
+                self.data_handler.materialize_recurring()
+                self.repeat_dropdown.selected = "Once"
             self.amount_input.text = ""
             self.description_input.text = ""
             self.current_screen = "main"
             print("Transaction added successfully")
         except ValueError:
-            print("Please enter a valid amount")
+            print("Please enter a valid amount and date")
     
-    def handle_view_transactions_screen(self, mouse_pos, mouse_clicked):
-        font_title.render_to(self.screen, (WIDTH//2 - 150, 50), "Transactions", BLACK)
-        if not self.transactions:
-            font_medium.render_to(self.screen, (WIDTH//2 - 150, 300), "No transactions found", BLACK)
+    def handle_view_transactions_screen(self, events, mouse_pos, mouse_clicked):
+        if self.full_redraw:
+            blit_text(self.screen, font_title, (WIDTH//2 - 150, 10), "Transactions", BLACK)
+            if self.search_message:
+                blit_text(self.screen, font_medium, (50, 650), self.search_message, RED)
+        
+        # Enter in any of the search boxes runs the search
+        submitted = any(search_input.active for search_input in self.search_inputs) and any(
+            event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN for event in events)
+        for search_input in self.search_inputs:
+            search_input.update(events)
+            self.draw_widget(search_input)
+        for button in self.search_buttons:
+            button.update(mouse_pos)
+            if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
+                if button is self.search_type_button:
+                    self.cycle_search_type()
+                elif button.text == "Search":
+                    submitted = True
+                elif button.text == "Clear":
+                    self.open_transactions_view()
+            self.draw_widget(button)
+        if submitted:
+            self.run_search()
+        
+        for button in self.view_transactions_buttons:
+            button.update(mouse_pos)
+            self.draw_widget(button)
+            if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
+                if button.text == "Previous" and self.transaction_page > 0:
+                    self.previous_transactions_page()
+                elif button.text == "Next" and (self.transaction_page + 1) * self.transactions_per_page < self.transaction_count:
+                    self.next_transactions_page()
+                elif button.text == "Back":
+                    self.current_screen = "main"
+                elif button.text == "Undo":
+                    self.undo_delete()
+                elif button.text == "Delete page":
+                    self.delete_page()
+        
+        if not self.page_transactions:
+            if self.full_redraw:
+                blit_text(self.screen, font_medium, (WIDTH//2 - 150, 300), "No transactions found", BLACK)
         else:
-            start_idx = self.transaction_page * self.transactions_per_page
-            end_idx = min(start_idx + self.transactions_per_page, len(self.transactions))
-            headers = ["Date", "Amount", "Category", "Type", "Description"]
-            header_positions = [100, 250, 400, 550, 650]
-            for header, x_pos in zip(headers, header_positions):
-                font_medium.render_to(self.screen, (x_pos, 100), header, BLACK)
-            pygame.draw.line(self.screen, BLACK, (50, 120), (WIDTH-50, 120), 2)
-            
-            # Create delete buttons for each transaction
-            delete_buttons = []
-            for i, transaction in enumerate(self.transactions[start_idx:end_idx]):
-                y_pos = 150 + i * 50
-                date_str = transaction['date']
-                amount_str = f"{transaction['amount']:.2f}"
-                font_small.render_to(self.screen, (100, y_pos), date_str, BLACK)
-                font_small.render_to(self.screen, (250, y_pos), amount_str, BLACK)
-                font_small.render_to(self.screen, (400, y_pos), transaction['category'], BLACK)
-                font_small.render_to(self.screen, (550, y_pos), transaction['transaction_type'].capitalize(), BLACK)
-                description = transaction['description']
-                if description and len(description) > 30:
-                    description = description[:27] + "..."
-                font_small.render_to(self.screen, (650, y_pos), description or "", BLACK)
-                
-                # Add delete button for this transaction
-                delete_button = Button(900, y_pos - 10, 80, 30, "Delete", RED)
-                delete_buttons.append((delete_button, transaction))
-                delete_button.draw(self.screen)
-            
-            page_text = f"Page {self.transaction_page + 1} of {max(1, (len(self.transactions) - 1) // self.transactions_per_page + 1)}"
-            font_medium.render_to(self.screen, (WIDTH//2 - 50, 650), page_text, BLACK)
-            for button in self.view_transactions_buttons:
-                button.update(mouse_pos)
-                button.draw(self.screen)
-                if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
-                    if button.text == "Previous" and self.transaction_page > 0:
-                        self.transaction_page -= 1
-                    elif button.text == "Next" and (self.transaction_page + 1) * self.transactions_per_page < len(self.transactions):
-                        self.transaction_page += 1
-                    elif button.text == "Back":
-                        self.current_screen = "main"
+            if self.full_redraw:
+                self.draw_transaction_rows()
             
             # Handle delete button clicks
-            for delete_button, transaction in delete_buttons:
+            for delete_button, transaction in self.delete_buttons:
                 delete_button.update(mouse_pos)
+                self.draw_widget(delete_button)
                 if mouse_clicked and delete_button.is_clicked(mouse_pos, mouse_clicked):
+                    # The page catches up when the delete commits; see apply_changes()
                     self.delete_transaction(transaction)
-                    self.load_data()  # Reload transactions after deletion
                     break
+
+    def draw_transaction_rows(self):
+        headers = ["Date", "Amount", "Category", "Type", "Description"]
+        header_positions = [100, 250, 400, 550, 650]
+        for header, x_pos in zip(headers, header_positions):
+            blit_text(self.screen, font_medium, (x_pos, 100), header, BLACK)
+        pygame.draw.line(self.screen, BLACK, (50, 120), (WIDTH-50, 120), 2)
+        
+        for i, transaction in enumerate(self.page_transactions):
+            y_pos = 150 + i * 50
+            date_str = transaction['date']
+            amount_str = f"{transaction['amount']:.2f}"
+            blit_text(self.screen, font_small, (100, y_pos), date_str, BLACK)
+            blit_text(self.screen, font_small, (250, y_pos), amount_str, BLACK)
+            blit_text(self.screen, font_small, (400, y_pos), transaction['category'], BLACK)
+            blit_text(self.screen, font_small, (550, y_pos), transaction['transaction_type'].capitalize(), BLACK)
+            description = transaction['description']
+            if description and len(description) > 30:
+                description = description[:27] + "..."
+            blit_text(self.screen, font_small, (650, y_pos), description or "", BLACK)
+        
+        page_text = f"Page {self.transaction_page + 1} of {max(1, (self.transaction_count - 1) // self.transactions_per_page + 1)}"
+        blit_text(self.screen, font_medium, (WIDTH//2 - 50, 650), page_text, BLACK)
     
     def delete_transaction(self, transaction):
         # Assuming transaction has a unique identifier (e.g., 'id' from the database)
         transaction_id = transaction.get('id')
         if transaction_id is not None:
             self.data_handler.delete_transaction(transaction_id)
+            self.push_undo([transaction])
             print(f"Transaction {transaction_id} deleted successfully")
         else:
             print("Error: Transaction ID not found")
 
+    def delete_page(self):
+        rows = self.data_handler.delete_transactions([transaction['id'] for transaction in self.page_transactions])
+        if rows:
+            self.push_undo(rows)
+            print(f"Deleted {len(rows)} transactions")
+
+    def push_undo(self, rows):
+        self.undo_stack.append(rows)
+        del self.undo_stack[:-UNDO_DEPTH]
+
+    def undo_delete(self):
+        if not self.undo_stack:
+            return
+        rows = self.undo_stack.pop()
+        restored = self.data_handler.restore_transactions(rows)
+        print(f"Restored {restored} transactions")
+
     def handle_charts_screen(self, events, mouse_pos, mouse_clicked):
-        font_title.render_to(self.screen, (WIDTH//2 - 150, 50), "Charts & Analytics", BLACK)
+        if self.full_redraw:
+            blit_text(self.screen, font_title, (WIDTH//2 - 150, 50), "Charts & Analytics", BLACK)
         for button in self.chart_buttons:
             button.update(mouse_pos)
-            button.draw(self.screen)
+            self.draw_widget(button)
             if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
                 if button.text == "Expense Pie Chart":
                     self.chart_type = "pie_expense"
@@ -487,45 +1051,136 @@ class FinanceTrackerApp:
                     self.generate_chart()
                 elif button.text == "Back":
                     self.current_screen = "main"
+                    self.chart_worker.cancel()
+                    self.chart_pending_key = None
         
         self.year_input.update(events)
-        self.year_input.draw(self.screen)
+        self.draw_widget(self.year_input)
         self.update_chart_button.update(mouse_pos)
-        self.update_chart_button.draw(self.screen)
+        self.draw_widget(self.update_chart_button)
         if mouse_clicked and self.update_chart_button.is_clicked(mouse_pos, mouse_clicked):
             self.current_year = self.year_input.text
             self.generate_chart()
         
-        if self.current_chart_surface:
-            chart_width, chart_height = self.current_chart_surface.get_size()
-            scaled_width = int(chart_width * self.zoom_scale)
-            scaled_height = int(chart_height * self.zoom_scale)
-            scaled_surface = pygame.transform.scale(self.current_chart_surface, (scaled_width, scaled_height))
-            
-            chart_x = (self.screen.get_width() - scaled_width) // 2
-            chart_y = 150
-            self.screen.blit(scaled_surface, (chart_x, chart_y))
+        self.collect_chart_result()
+        width, height = self.screen.get_size()
+        self.chart_viewport.rect = pygame.Rect(0, CHART_TOP, width, height - CHART_TOP)
+        self.chart_viewport.set_chart(self.current_chart_surface if self.chart_pending_key is None else None)
+        if self.chart_pending_key is not None:
+            self.draw_chart_placeholder()
+        elif self.current_chart_surface:
+            if self.full_redraw:
+                self.chart_viewport.draw(self.screen)
+            elif self.dirty_rects:
+                # The chart sits above the buttons; put it back over any widget
+                # that was just repainted underneath it
+                self.chart_viewport.draw(self.screen, self.dirty_rects)
+
+    def chart_widgets(self):
+        return self.chart_buttons + [self.year_input, self.update_chart_button]
+
+    def pan_chart(self, event):
+        # Presses on the widgets drawn over the chart are theirs, not the start of a drag
+        if event.type == pygame.MOUSEBUTTONDOWN and any(
+                widget.rect.collidepoint(event.pos) for widget in self.chart_widgets()):
+            return False
+        return self.chart_viewport.handle_event(event)
     
+    def chart_cache_key(self):
+        # Pie charts and the running balance cover the whole ledger, the rest one year
+        whole_ledger = self.chart_type.startswith("pie_") or self.chart_type == "balance_over_time"
+        year = None if whole_ledger else self.current_year
+        return (self.chart_type, year, self.current_chart_backend(), self.screen.get_size(),
+                self.data_handler.data_generation())
+
+    def current_chart_backend(self):
+        return self.chart_backends.get(self.chart_type, self.chart_backend)
+
     def generate_chart(self):
-        fig = None
-        if self.chart_type == "pie_expense":
-            fig = self.visualizer.pie_chart_by_category("expense")
-        elif self.chart_type == "pie_income":
-            fig = self.visualizer.pie_chart_by_category("income")
-        elif self.chart_type == "pie_saving":
-            fig = self.visualizer.pie_chart_by_category("saving")
-        elif self.chart_type == "monthly_summary":
-            fig = self.visualizer.bar_chart_monthly_summary(self.current_year)
-        elif self.chart_type == "balance_over_time":
-            fig = self.visualizer.line_chart_balance_over_time(self.current_year)
-        elif self.chart_type == "financial_flow":
-            fig = self.visualizer.stacked_area_chart(self.current_year)
-        
-        if fig:
-            self.current_chart_surface = self.visualizer.fig_to_surface(fig)
+        key = self.chart_cache_key()
+        cached = self.chart_cache.get(key, MISSING)
+        if cached is not MISSING:
+            self.current_chart_surface = cached
+            self.invalidate()
+            if self.chart_pending_key is not None:
+                self.chart_worker.cancel()
+                self.chart_pending_key = None
+            return
+        if key == self.chart_pending_key:
+            return
+        # Rendered on the worker thread; rapid requests collapse to the latest
+        self.chart_pending_key = key
+        self.chart_submitted_at = time.perf_counter()
+        self.current_chart_surface = None
+        self.invalidate()
+        self.chart_worker.submit(key, self.chart_type, self.current_year, self.current_chart_backend())
+        self.start_chart_worker()
+
+    def collect_chart_result(self):
+        result = self.chart_worker.poll()
+        if result is None:
+            return
+        if result.error:
+            print(f"Chart rendering failed: {result.error}")
+            surface = None
         else:
-            self.current_chart_surface = None
+            if result.rgba:
+                with metrics.timer("chart.surface"):
+                    surface = pygame.image.frombuffer(result.rgba, result.size, "RGBA").convert()
+            elif result.surface:
+                # Native charts arrive as a surface; display format blits faster
+                with metrics.timer("chart.surface"):
+                    surface = result.surface.convert()
+            else:
+                surface = None
+            self.chart_cache.put(result.key, surface)
+        if result.key == self.chart_pending_key:
+            metrics.record("chart.latency", (time.perf_counter() - self.chart_submitted_at) * 1000)
+            self.current_chart_surface = surface
+            self.chart_pending_key = None
+            self.invalidate()
+
+    def draw_chart_placeholder(self):
+        center = (self.screen.get_width() // 2 + 100, 400)
+        if self.full_redraw:
+            blit_text(self.screen, font_medium, (center[0] - 70, center[1] + 50), "Rendering chart...", DARK_GRAY)
+        angle = pygame.time.get_ticks() / 150
+        spinner_rect = pygame.Rect(0, 0, 60, 60)
+        spinner_rect.center = center
+        if not self.full_redraw:
+            self.restore_background(spinner_rect)
+            self.dirty_rects.append(spinner_rect)
+        pygame.draw.arc(self.screen, BLUE, spinner_rect, angle, angle + 4.5, 5)
 
 if __name__ == "__main__":
-    app = FinanceTrackerApp()
+    parser = argparse.ArgumentParser(description="Personal Finance Tracker")
+    parser.add_argument("--max-fps", type=int, default=60, help="frame rate cap while animating (default: 60)")
+    parser.add_argument("--no-idle-wait", action="store_true", help="poll continuously instead of sleeping when idle")
+    parser.add_argument("--metrics-dump", metavar="PATH",
+                        help="write latency histograms and cache hit rates as JSON to PATH on exit")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--chart-backend", choices=CHART_BACKENDS, default="native",
+                        help="chart renderer: native pygame drawing or matplotlib (default: native)")
+    parser.add_argument("--chart-backend-for", action="append", default=[], metavar="CHART=BACKEND",
+                        help="renderer for one chart type, e.g. balance_over_time=matplotlib (repeatable)")
+    parser.add_argument("--project-recurring", action="store_true",
+                        help="include recurring transactions that are not due yet in the charts")
+    parser.add_argument("--write-policy", default=DEFAULT_WRITE_POLICY,
+                        help="when queued writes are committed: 'immediate', or limits such as '50ms', '100ops' "
+                             f"or '50ms,100ops' (default: {DEFAULT_WRITE_POLICY})")
+    args = parser.parse_args()
+    try:
+        parse_policy(args.write_policy)
+    except ValueError as e:
+        parser.error(str(e))
+    chart_backends = {}
+    for entry in args.chart_backend_for:
+        chart_type, _, backend = entry.partition("=")
+        if chart_type not in CHART_TYPES or backend not in CHART_BACKENDS:
+            parser.error(f"--chart-backend-for expects CHART=BACKEND with CHART one of {', '.join(CHART_TYPES)} "
+                         f"and BACKEND one of {', '.join(CHART_BACKENDS)}")
+        chart_backends[chart_type] = backend
+    app = FinanceTrackerApp(max_fps=args.max_fps, idle_wait=not args.no_idle_wait, metrics_dump=args.metrics_dump,
+                            db_path=args.db, chart_backend=args.chart_backend, chart_backends=chart_backends,
+                            write_policy=args.write_policy, project_recurring=args.project_recurring)
     app.run()
\ No newline at end of file
@@ -0,0 +1,297 @@
+import math
+from datetime import date
+
+import numpy as np
+import pygame
+
+from data_handler import pick_granularity
+from instrumentation import metrics
+
+# matplotlib's default color cycle, so both backends color series alike
+PALETTE = [(31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+           (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207)]
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRID = (176, 176, 176)
+ZERO_LINE = (128, 128, 128)
+
+# Same pixel sizes as the matplotlib figures (figsize x 100 dpi); these and
+# every other length here are at scale 1.0
+PIE_SIZE = (1000, 600)
+CHART_SIZE = (1200, 600)
+# Space around the plot area for ticks and labels: left, top, right, bottom
+MARGINS = (110, 50, 30, 110)
+
+
+def nice_ticks(low, high, count=6):
+    """Round tick values spanning [low, high], stepping by 1, 2 or 5 times a power of ten"""
+    if high <= low:
+        high = low + 1
+    raw = (high - low) / (count - 1)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    return np.arange(math.floor(low / step), math.ceil(high / step) + 1) * step
+
+
+def format_tick(value, step):
+    return f"{value:,.0f}" if step >= 1 else f"{value:,.2f}"
+
+
+def blend(color, alpha):
+    """Color drawn at `alpha` over a white background"""
+    return tuple(int(c * alpha + 255 * (1 - alpha)) for c in color)
+
+
+class PlotArea:
+    """Maps data coordinates to pixels inside the chart margins"""
+
+    def __init__(self, surface, margins, x_low, x_high, y_low, y_high):
+        left, top, right, bottom = margins
+        self.rect = pygame.Rect(left, top, surface.get_width() - left - right,
+                                surface.get_height() - top - bottom)
+        self.ticks = nice_ticks(min(y_low, 0), max(y_high, 0))
+        self.x_low, self.x_high = x_low, x_high
+        self.y_low, self.y_high = self.ticks[0], self.ticks[-1]
+
+    def x(self, value):
+        return self.rect.left + (value - self.x_low) / ((self.x_high - self.x_low) or 1) * self.rect.width
+
+    def y(self, value):
+        return self.rect.bottom - (value - self.y_low) / (self.y_high - self.y_low) * self.rect.height
+
+
+class PygameChartRenderer:
+    """Draws the app's charts straight onto pygame surfaces.
+
+    A fast path for on-screen charts: no figure objects, no Agg pass and
+    no RGBA copy. It mirrors FinanceVisualizer's chart methods, which stay
+    the choice for export-quality output. `scale` multiplies every size,
+    for charts that will be shown zoomed in. `projected` adds recurring
+    occurrences that are not written yet.
+    """
+
+    def __init__(self, data_handler, scale=1.0, projected=False):
+        self.data_handler = data_handler
+        self.scale = scale
+        self.projected = projected
+        self.margins = [self.px(margin) for margin in MARGINS]
+        if not pygame.font.get_init():
+            pygame.font.init()
+        # pygame's bundled font, which needs no system font lookup
+        self.title_font = pygame.font.Font(None, self.px(30))
+        self.label_font = pygame.font.Font(None, self.px(24))
+        self.tick_font = pygame.font.Font(None, self.px(20))
+
+    def px(self, length):
+        """A length in pixels at this renderer's scale"""
+        return max(1, round(length * self.scale))
+
+    def new_surface(self, size):
+        surface = pygame.Surface((self.px(size[0]), self.px(size[1])))
+        surface.fill(WHITE)
+        return surface
+
+    def build_chart(self, chart_type, year):
+        """Draw one of CHART_TYPES to a surface, or None when there is no data"""
+        if chart_type == "pie_expense":
+            return self.pie_chart_by_category("expense")
+        elif chart_type == "pie_income":
+            return self.pie_chart_by_category("income")
+        elif chart_type == "pie_saving":
+            return self.pie_chart_by_category("saving")
+        elif chart_type == "monthly_summary":
+            return self.bar_chart_monthly_summary(year)
+        elif chart_type == "balance_over_time":
+            return self.line_chart_balance_over_time()
+        elif chart_type == "financial_flow":
+            return self.stacked_area_chart(year)
+        raise ValueError(f"Unknown chart type: {chart_type}")
+
+    def pie_chart_by_category(self, transaction_type, start_date=None, end_date=None):
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_summary_by_category(transaction_type, start_date, end_date,
+                                                           projected=self.projected)
+
+        totals = df['total'].to_numpy(dtype=float) if not df.empty else None
+        if totals is None or totals.sum() <= 0:
+            return None
+
+        with metrics.timer("chart.draw"):
+            surface = self.new_surface(PIE_SIZE)
+            title = f'{transaction_type.capitalize()} Distribution by Category'
+            if start_date and end_date:
+                title += f" ({start_date} to {end_date})"
+            self.draw_title(surface, title)
+
+            center = (surface.get_width() / 2, surface.get_height() / 2 + self.px(15))
+            radius = surface.get_height() * 0.36
+            # Counterclockwise from twelve o'clock, like matplotlib's startangle=90
+            bounds = 90 + 360 * np.concatenate([[0], np.cumsum(totals)]) / totals.sum()
+            for i, (category, start, end) in enumerate(zip(df['category'], bounds[:-1], bounds[1:])):
+                steps = np.linspace(start, end, max(2, int(end - start) // 2 + 2))
+                points = [center] + [self.polar(center, radius, angle) for angle in steps]
+                color = PALETTE[i % len(PALETTE)]
+                pygame.draw.polygon(surface, color, points)
+                pygame.draw.aalines(surface, color, False, points[1:])
+
+                middle = (start + end) / 2
+                share = (end - start) / 360 * 100
+                self.blit_text(surface, self.tick_font, f"{share:.1f}%", self.polar(center, radius * 0.6, middle),
+                               "center")
+                label_anchor = "midleft" if math.cos(math.radians(middle)) >= 0 else "midright"
+                self.blit_text(surface, self.label_font, str(category), self.polar(center, radius * 1.1, middle),
+                               label_anchor)
+
+        return surface
+
+    def bar_chart_monthly_summary(self, year):
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_monthly_summary(year, projected=self.projected)
+
+        if df.empty:
+            return None
+
+        with metrics.timer("chart.draw"):
+            series = [('Income', df['income'].to_numpy()), ('Expense', df['expense'].to_numpy()),
+                      ('Saving', df['saving'].to_numpy())]
+            values = np.concatenate([column for _, column in series])
+            surface = self.new_surface(CHART_SIZE)
+            plot = PlotArea(surface, self.margins, -0.5, len(df) - 0.5, values.min(), values.max())
+            self.draw_axes(surface, plot, 'Amount')
+
+            width = 0.25
+            zero = plot.y(0)
+            for offset, (color, (_, column)) in zip((-width, 0, width), zip(PALETTE, series)):
+                for x, value in enumerate(column):
+                    left, right = plot.x(x + offset - width / 2), plot.x(x + offset + width / 2)
+                    top, bottom = sorted((plot.y(value), zero))
+                    pygame.draw.rect(surface, color, pygame.Rect(round(left), round(top),
+                                                                 max(1, round(right - left)),
+                                                                 max(1, round(bottom - top))))
+
+            self.draw_x_labels(surface, plot, list(enumerate(df['month_name'])), 45)
+            self.draw_title(surface, f'Monthly Financial Summary - {year}')
+            self.draw_legend(surface, plot, [name for name, _ in series], "topright")
+
+        return surface
+
+    def line_chart_balance_over_time(self, start_date=None, end_date=None, granularity=None):
+        """Running balance across the range (the whole ledger by default)"""
+        with metrics.timer("chart.query"):
+            if not (start_date and end_date):
+                first, last = self.data_handler.get_date_range()
+                if self.projected and last:
+                    # Run on through the year's projected occurrences
+                    last = max(last, f"{date.today().year}-12-31")
+                start_date, end_date = start_date or first, end_date or last
+            if not (start_date and end_date):
+                return None
+            granularity = granularity or pick_granularity(start_date, end_date)
+            df = self.data_handler.get_time_series(start_date, end_date, granularity, projected=self.projected)
+
+        if df.empty:
+            return None
+
+        with metrics.timer("chart.draw"):
+            days = df['period'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+            balance = df['balance'].to_numpy()
+            surface = self.new_surface(CHART_SIZE)
+            plot = PlotArea(surface, self.margins, days[0], days[-1], balance.min(), balance.max())
+            self.draw_axes(surface, plot, 'Running Balance (Income - Expense)', granularity.capitalize())
+            if plot.y_low < 0 < plot.y_high:
+                pygame.draw.line(surface, ZERO_LINE, (plot.rect.left, plot.y(0)), (plot.rect.right, plot.y(0)),
+                                 self.px(1))
+
+            points = [(plot.x(day), plot.y(value)) for day, value in zip(days, balance)]
+            if len(points) > 1:
+                pygame.draw.lines(surface, PALETTE[0], False, points, self.px(2))
+            if len(points) <= 40:
+                for point in points:
+                    pygame.draw.circle(surface, PALETTE[0], point, self.px(4))
+
+            # About eight evenly spaced period labels
+            label_width = 10 if granularity in ('day', 'week') else 7
+            stride = max(1, math.ceil(len(df) / 8))
+            labels = [(day, period[:label_width]) for day, period in zip(days[::stride], df['period'][::stride])]
+            self.draw_x_labels(surface, plot, labels, 30)
+            self.draw_title(surface, f'Balance Over Time - {start_date[:10]} to {end_date[:10]}')
+
+        return surface
+
+    def stacked_area_chart(self, year):
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_monthly_summary(year, projected=self.projected)
+
+        if df.empty:
+            return None
+
+        with metrics.timer("chart.draw"):
+            names = ['Income', 'Expense', 'Saving']
+            layers = np.cumsum([df['income'].to_numpy(), df['expense'].to_numpy(), df['saving'].to_numpy()], axis=0)
+            surface = self.new_surface(CHART_SIZE)
+            x = np.arange(len(df))
+            plot = PlotArea(surface, self.margins, -0.05 * max(len(df) - 1, 1), (len(df) - 1) * 1.05 or 1,
+                            layers.min(), layers.max())
+            self.draw_axes(surface, plot, 'Amount', 'Month')
+
+            below = np.zeros(len(df))
+            for color, layer in zip(PALETTE, layers):
+                top = [(plot.x(i), plot.y(value)) for i, value in zip(x, layer)]
+                bottom = [(plot.x(i), plot.y(value)) for i, value in zip(x[::-1], below[::-1])]
+                if len(top) > 1:
+                    pygame.draw.polygon(surface, blend(color, 0.8), top + bottom)
+                below = layer
+
+            self.draw_x_labels(surface, plot, list(enumerate(df['month_name'])), 45)
+            self.draw_title(surface, f'Financial Flow - {year}')
+            self.draw_legend(surface, plot, names, "topleft", alpha=0.8)
+
+        return surface
+
+    def draw_title(self, surface, title):
+        self.blit_text(surface, self.title_font, title, (surface.get_width() / 2, self.px(25)), "center")
+
+    def draw_axes(self, surface, plot, ylabel, xlabel=None):
+        step = plot.ticks[1] - plot.ticks[0]
+        for tick in plot.ticks:
+            y = plot.y(tick)
+            pygame.draw.line(surface, GRID, (plot.rect.left, y), (plot.rect.right, y), self.px(1))
+            self.blit_text(surface, self.tick_font, format_tick(tick, step), (plot.rect.left - self.px(8), y),
+                           "midright")
+        pygame.draw.rect(surface, BLACK, plot.rect, self.px(1))
+
+        label = pygame.transform.rotate(self.label_font.render(ylabel, True, BLACK), 90)
+        surface.blit(label, label.get_rect(midleft=(self.px(12), plot.rect.centery)))
+        if xlabel:
+            self.blit_text(surface, self.label_font, xlabel,
+                           (plot.rect.centerx, surface.get_height() - self.px(12)), "midbottom")
+
+    def draw_x_labels(self, surface, plot, labels, angle):
+        for value, text in labels:
+            x = plot.x(value)
+            pygame.draw.line(surface, BLACK, (x, plot.rect.bottom), (x, plot.rect.bottom + self.px(4)), self.px(1))
+            image = pygame.transform.rotate(self.tick_font.render(str(text), True, BLACK), angle)
+            # Rotated labels hang down and to the left of their tick
+            surface.blit(image, image.get_rect(topright=(x + self.px(4), plot.rect.bottom + self.px(6))))
+
+    def draw_legend(self, surface, plot, names, corner, alpha=1.0):
+        px = self.px
+        rows = [self.label_font.render(name, True, BLACK) for name in names]
+        box = pygame.Rect(0, 0, px(40) + max(row.get_width() for row in rows), px(10) + px(24) * len(rows))
+        setattr(box, corner, getattr(plot.rect.inflate(-px(20), -px(20)), corner))
+        pygame.draw.rect(surface, WHITE, box)
+        pygame.draw.rect(surface, GRID, box, px(1))
+        for i, (color, row) in enumerate(zip(PALETTE, rows)):
+            top = box.top + px(6) + px(24) * i
+            pygame.draw.rect(surface, blend(color, alpha), pygame.Rect(box.left + px(8), top + px(3), px(20), px(12)))
+            surface.blit(row, (box.left + px(34), top))
+
+    @staticmethod
+    def polar(center, radius, degrees):
+        angle = math.radians(degrees)
+        return center[0] + radius * math.cos(angle), center[1] - radius * math.sin(angle)
+
+    @staticmethod
+    def blit_text(surface, font, text, position, anchor="topleft"):
+        image = font.render(text, True, BLACK)
+        surface.blit(image, image.get_rect(**{anchor: (round(position[0]), round(position[1]))}))
@@ -0,0 +1,50 @@
+import calendar
+from datetime import date, timedelta
+
+# How often a recurring rule repeats, each multiplied by the rule's interval
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+# Days per step for day-based frequencies, months per step for the rest
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+FREQUENCY_MONTHS = {'monthly': 1, 'yearly': 12}
+
+
+def add_months(day, months):
+    """`day` moved by whole months, clamped to the last day of shorter months"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return day.replace(year=year, month=month + 1, day=min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def occurrences(start_date, frequency, interval=1, after=None, through=None):
+    """ISO dates a rule falls on after `after` (exclusive) up to `through` (inclusive).
+
+    Occurrences are always counted from `start_date`, so a monthly rule
+    starting on the 31st lands on the last day of shorter months and
+    returns to the 31st after them. Skipping to `after` is arithmetic,
+    not a walk from the start, so catching up costs only the dates
+    returned.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    start = date.fromisoformat(start_date[:10])
+    last = date.fromisoformat(through[:10])
+    first = start if after is None else max(start, date.fromisoformat(after[:10]) + timedelta(days=1))
+    dates = []
+    if frequency in FREQUENCY_DAYS:
+        step = FREQUENCY_DAYS[frequency] * interval
+        day = start + timedelta(days=-(-(first - start).days // step) * step)
+        while day <= last:
+            dates.append(day.isoformat())
+            day += timedelta(days=step)
+    else:
+        step = FREQUENCY_MONTHS[frequency] * interval
+        n = ((first.year - start.year) * 12 + first.month - start.month) // step
+        if add_months(start, n * step) < first:
+            n += 1
+        while (day := add_months(start, n * step)) <= last:
+            dates.append(day.isoformat())
+            n += 1
+    return dates
@@ -0,0 +1,164 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from chart_worker import CHART_TYPES
+from data_handler import FinanceDataHandler
+from db_setup import DEFAULT_DB_PATH
+
+REPORT_FORMATS = ["png", "pdf"]
+DEFAULT_DPI = 150
+
+# Charts drawn from the same query are rendered by one task, so the
+# worker's summary cache answers the second from the first; every other
+# chart is a task of its own, which keeps all cores busy on short reports
+CHART_GROUPS = [
+    ["pie_expense"],
+    ["pie_income"],
+    ["pie_saving"],
+    ["monthly_summary", "financial_flow"],
+    ["balance_over_time"],
+]
+
+# Charts of one calendar year's months, left out of reports on date ranges
+YEAR_CHART_TYPES = {"monthly_summary", "financial_flow"}
+
+# The read-only visualizer of each pool process; see init_worker()
+_visualizer = None
+
+
+class ReportPeriod:
+    """A calendar year or an inclusive date range with a set of charts of its own"""
+
+    def __init__(self, label, start_date, end_date, year=None):
+        self.label = label
+        self.start_date = start_date
+        self.end_date = end_date
+        self.year = year
+
+    @classmethod
+    def parse(cls, text):
+        """'2024' for a year or '2024-01-01:2024-06-30' for a range; ValueError otherwise"""
+        if ":" in text:
+            start_date, _, end_date = text.partition(":")
+            if date.fromisoformat(start_date) > date.fromisoformat(end_date):
+                raise ValueError(f"range {text!r} ends before it starts")
+            return cls(f"{start_date}_{end_date}", start_date, end_date)
+        year = int(text)
+        return cls(str(year), f"{year:04d}-01-01", f"{year:04d}-12-31", str(year))
+
+    def covers(self, chart_type):
+        return self.year is not None or chart_type not in YEAR_CHART_TYPES
+
+    def __repr__(self):
+        return f"ReportPeriod({self.label!r})"
+
+
+def build_chart(visualizer, chart_type, period):
+    """The figure for one of CHART_TYPES over `period`, or None when there is no data"""
+    if chart_type in ("pie_expense", "pie_income", "pie_saving"):
+        return visualizer.pie_chart_by_category(chart_type[len("pie_"):], period.start_date, period.end_date)
+    elif chart_type == "monthly_summary":
+        return visualizer.bar_chart_monthly_summary(period.year)
+    elif chart_type == "balance_over_time":
+        return visualizer.line_chart_balance_over_time(period.start_date, period.end_date)
+    elif chart_type == "financial_flow":
+        return visualizer.stacked_area_chart(period.year)
+    raise ValueError(f"Unknown chart type: {chart_type}")
+
+
+def init_worker(db_path, projected):
+    global _visualizer
+    import matplotlib
+    matplotlib.use("Agg")
+    from visualizer import FinanceVisualizer
+    # Read-only, so a report never takes a write lock from the app
+    _visualizer = FinanceVisualizer(FinanceDataHandler(db_path, read_only=True), projected=projected)
+
+
+def render_charts(period, chart_types, output_dir, formats, dpi):
+    """Write each chart in every format; (period label, paths written, chart types with no data)"""
+    written, empty = [], []
+    for chart_type in chart_types:
+        fig = build_chart(_visualizer, chart_type, period)
+        if fig is None:
+            empty.append(chart_type)
+            continue
+        for fmt in formats:
+            path = os.path.join(output_dir, f"{period.label}_{chart_type}.{fmt}")
+            fig.savefig(path, dpi=dpi, format=fmt)
+            written.append(path)
+    return period.label, written, empty
+
+
+def generate_report(db_path, periods, output_dir, chart_types=CHART_TYPES, formats=("png",), dpi=DEFAULT_DPI,
+                    workers=None, projected=False):
+    """Render `chart_types` for every period into `output_dir` on a process pool.
+
+    Each worker reads through its own read-only connection. Files are
+    named PERIOD_CHART.FORMAT. Returns render_charts() results in
+    submission order.
+    """
+    # Imported before the pool starts, so forked workers inherit matplotlib and pandas
+    import visualizer  # noqa: F401
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for period in periods:
+        for group in CHART_GROUPS:
+            charts = [chart_type for chart_type in group if chart_type in chart_types and period.covers(chart_type)]
+            if charts:
+                tasks.append((period, charts))
+    if not tasks:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(db_path, projected)) as pool:
+        futures = [pool.submit(render_charts, period, charts, output_dir, formats, dpi) for period, charts in tasks]
+        return [future.result() for future in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every chart for years or date ranges, without a window")
+    parser.add_argument("periods", nargs="+", metavar="PERIOD",
+                        help="a year such as 2024, or a range such as 2024-01-01:2024-06-30")
+    parser.add_argument("--output", default="reports", help="directory for the chart files (default: reports)")
+    parser.add_argument("--format", action="append", dest="formats", choices=REPORT_FORMATS,
+                        help="file format (repeatable; default: png)")
+    parser.add_argument("--chart", action="append", dest="charts", choices=CHART_TYPES,
+                        help="chart type to render (repeatable; default: all)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help=f"resolution (default: {DEFAULT_DPI})")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--project-recurring", action="store_true",
+                        help="include recurring transactions that are not due yet")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"database file (default: {DEFAULT_DB_PATH})")
+    args = parser.parse_args(argv)
+    try:
+        periods = [ReportPeriod.parse(text) for text in args.periods]
+    except ValueError as e:
+        parser.error(f"invalid period: {e}")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not os.path.exists(args.db):
+        parser.error(f"no database at {args.db}")
+
+    # Workers only read, so write any recurring transactions due by now first
+    with FinanceDataHandler(args.db) as handler:
+        handler.materialize_recurring()
+
+    start = time.perf_counter()
+    results = generate_report(args.db, periods, args.output, args.charts or CHART_TYPES, args.formats or ["png"],
+                              args.dpi, args.workers, args.project_recurring)
+    elapsed = time.perf_counter() - start
+    written = 0
+    for label, paths, empty in results:
+        written += len(paths)
+        if empty:
+            print(f"{label}: no data for {', '.join(empty)}")
+    print(f"Wrote {written} files to {args.output} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
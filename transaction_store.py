@@ -0,0 +1,181 @@
+import numpy as np
+
+# Date ordinals are days since 1970-01-01, as numpy's datetime64[D] counts them
+DATE_DTYPE = np.int32
+GROUP_KEYS = ("month", "category", "type")
+
+
+class StringTable:
+    """Interned strings: each distinct value is stored once and rows hold its code"""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        self.array = None
+
+    def encode(self, values):
+        codes = self.codes
+        table = self.values
+        out = []
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(table)
+                table.append(value)
+            out.append(code)
+        return out
+
+    def lookup(self, value):
+        """Code of `value`, or -1 when no row has it"""
+        return self.codes.get(value, -1)
+
+    def decode(self, codes):
+        if self.array is None or len(self.array) != len(self.values):
+            self.array = np.array(self.values, dtype=object)
+        return self.array[codes]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class TransactionStore:
+    """Column arrays of transactions for filtering and aggregating at numpy speed.
+
+    Categories, transaction types and descriptions are interned in string
+    tables shared by every store derived from this one through filter(),
+    sort() or indexing, so those only copy the numeric columns.
+    """
+
+    def __init__(self, ids, dates, amounts, type_codes, category_codes, description_codes,
+                 types, categories, descriptions):
+        self.ids = ids
+        self.dates = dates
+        self.amounts = amounts
+        self.type_codes = type_codes
+        self.category_codes = category_codes
+        self.description_codes = description_codes
+        self.types = types
+        self.categories = categories
+        self.descriptions = descriptions
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build a store from lists of (id, date, amount, category, description, type) rows"""
+        types, categories, descriptions = StringTable(), StringTable(), StringTable()
+        columns = {name: [] for name in ("ids", "dates", "amounts", "types", "categories", "descriptions")}
+        for rows in chunks:
+            ids, dates, amounts, categories_, descriptions_, types_ = zip(*rows)
+            columns["ids"].append(np.array(ids, dtype=np.int64))
+            # ISO days parse straight into day counts; anything after the day
+            # is dropped first, as _date_ordinal() does
+            columns["dates"].append(np.array([day[:10] for day in dates], dtype="datetime64[D]").astype(DATE_DTYPE))
+            columns["amounts"].append(np.array(amounts, dtype=np.float64))
+            columns["types"].append(np.array(types.encode(types_), dtype=np.int8))
+            columns["categories"].append(np.array(categories.encode(categories_), dtype=np.int32))
+            columns["descriptions"].append(np.array(descriptions.encode(descriptions_), dtype=np.int32))
+        dtypes = {"ids": np.int64, "dates": DATE_DTYPE, "amounts": np.float64,
+                  "types": np.int8, "categories": np.int32, "descriptions": np.int32}
+        arrays = {name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[name])
+                  for name, parts in columns.items()}
+        return cls(arrays["ids"], arrays["dates"], arrays["amounts"], arrays["types"], arrays["categories"],
+                   arrays["descriptions"], types, categories, descriptions)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """A store of the rows selected by a boolean mask, index array or slice"""
+        return TransactionStore(self.ids[index], self.dates[index], self.amounts[index], self.type_codes[index],
+                                self.category_codes[index], self.description_codes[index],
+                                self.types, self.categories, self.descriptions)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in (self.ids, self.dates, self.amounts, self.type_codes,
+                                                self.category_codes, self.description_codes))
+
+    def mask(self, start_date=None, end_date=None, transaction_types=None, categories=None,
+             min_amount=None, max_amount=None):
+        """Boolean array of the rows inside an inclusive date range and the given subsets"""
+        keep = np.ones(len(self), dtype=bool)
+        if start_date:
+            keep &= self.dates >= _date_ordinal(start_date)
+        if end_date:
+            keep &= self.dates <= _date_ordinal(end_date)
+        if transaction_types:
+            keep &= np.isin(self.type_codes, [self.types.lookup(value) for value in transaction_types])
+        if categories:
+            keep &= np.isin(self.category_codes, [self.categories.lookup(value) for value in categories])
+        if min_amount is not None:
+            keep &= self.amounts >= min_amount
+        if max_amount is not None:
+            keep &= self.amounts <= max_amount
+        return keep
+
+    def filter(self, **conditions):
+        return self[self.mask(**conditions)]
+
+    def sort(self, by="date", descending=False):
+        """Rows ordered by "date" (then id) or "amount"; ties keep their order"""
+        if by == "date":
+            order = np.lexsort((self.ids, self.dates))
+        elif by == "amount":
+            order = np.argsort(self.amounts, kind="stable")
+        else:
+            raise ValueError(f"cannot sort by {by!r}")
+        return self[order[::-1] if descending else order]
+
+    def month_codes(self):
+        """Months since 1970-01 for every row"""
+        return self.dates.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+
+    def sum_by(self, *keys):
+        """Total and count of amounts per distinct combination of `keys`.
+
+        Keys are "month", "category" and "type". Returns a dict of equal
+        length arrays: one per key (months as "YYYY-MM" strings) plus
+        "total" and "count". Groups come out in month order; categories and
+        types in the order they were first loaded.
+        """
+        if not keys or any(key not in GROUP_KEYS for key in keys):
+            raise ValueError(f"group keys must be drawn from {GROUP_KEYS}")
+        columns = {"month": self.month_codes, "category": lambda: self.category_codes,
+                   "type": lambda: self.type_codes}
+        codes = [columns[key]().astype(np.int64) for key in keys]
+        # Fold the key columns into one integer per row, then bincount it
+        combined = np.zeros(len(self), dtype=np.int64)
+        for column in codes:
+            low = column.min() if len(column) else 0
+            combined = combined * (int(column.max() - low + 1) if len(column) else 1) + (column - low)
+        groups, inverse = np.unique(combined, return_inverse=True)
+        # Any one row of each group gives that group's key values
+        representative = np.zeros(len(groups), dtype=np.int64)
+        representative[inverse] = np.arange(len(self))
+        result = {}
+        for key, column in zip(keys, codes):
+            values = column[representative]
+            if key == "month":
+                result[key] = values.astype("datetime64[M]").astype(str)
+            elif key == "category":
+                result[key] = self.categories.decode(values)
+            else:
+                result[key] = self.types.decode(values)
+        result["total"] = np.bincount(inverse, weights=self.amounts, minlength=len(groups))
+        result["count"] = np.bincount(inverse, minlength=len(groups))
+        return result
+
+    def records(self, start=0, stop=None):
+        """Rows in [start, stop) as dicts shaped like get_transactions_page()"""
+        part = self[start:stop]
+        return [
+            {"id": int(id_), "date": str(day), "amount": float(amount), "category": category,
+             "description": description, "transaction_type": transaction_type}
+            for id_, day, amount, category, description, transaction_type in zip(
+                part.ids, part.dates.astype("datetime64[D]"), part.amounts,
+                self.categories.decode(part.category_codes), self.descriptions.decode(part.description_codes),
+                self.types.decode(part.type_codes))
+        ]
+
+
+def _date_ordinal(value):
+    return np.datetime64(value[:10], "D").astype(DATE_DTYPE)
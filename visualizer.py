@@ -1,126 +1,243 @@
-import matplotlib.pyplot as plt
+from datetime import date
+
 import numpy as np
 from matplotlib.backends.backend_agg import FigureCanvasAgg
-import pygame
+from matplotlib.figure import Figure
+
+from data_handler import pick_granularity
+from instrumentation import metrics
+
+# Pixels per figsize inch at scale 1.0
+FIGURE_DPI = 100
+
+class ChartFigure:
+    """A figure, its Agg canvas and the artists of one chart, kept between renders"""
+
+    def __init__(self, figsize, dpi=FIGURE_DPI):
+        # "tight" re-runs tight_layout on every draw, so changed labels still fit
+        self.fig = Figure(figsize=figsize, dpi=dpi, layout="tight")
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.artists = None
+        self.shape = None
+
+    def rebuild(self, shape):
+        """Whether the artists must be created (on cleared axes) to plot data of `shape`"""
+        if self.artists is not None and shape == self.shape:
+            return False
+        self.ax.clear()
+        self.shape = shape
+        return True
 
 class FinanceVisualizer:
-    def __init__(self, data_handler):
+    """Matplotlib charts drawn with the object-oriented API only.
+
+    Each chart keeps one ChartFigure: the first render creates its artists
+    and later ones only move them (wedge angles, bar heights, line data,
+    area outlines) before redrawing the same canvas. Data of a different
+    shape, such as a year with fewer months, clears the axes and plots
+    them again. `scale` raises the rasterizing resolution for charts that
+    will be shown zoomed in. `projected` adds recurring occurrences that
+    are not written yet.
+    """
+
+    def __init__(self, data_handler, scale=1.0, projected=False):
         self.data_handler = data_handler
-    
+        self.scale = scale
+        self.projected = projected
+        self.figures = {}
+
+    def figure(self, name, figsize):
+        chart = self.figures.get(name)
+        if chart is None:
+            chart = self.figures[name] = ChartFigure(figsize, FIGURE_DPI * self.scale)
+        return chart
+
+    def build_chart(self, chart_type, year):
+        """Build the figure for one of chart_worker.CHART_TYPES, or None when there is no data"""
+        if chart_type == "pie_expense":
+            return self.pie_chart_by_category("expense")
+        elif chart_type == "pie_income":
+            return self.pie_chart_by_category("income")
+        elif chart_type == "pie_saving":
+            return self.pie_chart_by_category("saving")
+        elif chart_type == "monthly_summary":
+            return self.bar_chart_monthly_summary(year)
+        elif chart_type == "balance_over_time":
+            return self.line_chart_balance_over_time()
+        elif chart_type == "financial_flow":
+            return self.stacked_area_chart(year)
+        raise ValueError(f"Unknown chart type: {chart_type}")
+
     def pie_chart_by_category(self, transaction_type, start_date=None, end_date=None):
-        df = self.data_handler.get_summary_by_category(transaction_type, start_date, end_date)
-        
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_summary_by_category(transaction_type, start_date, end_date,
+                                                           projected=self.projected)
+
         if df.empty:
             return None
-        
-        # Create pie chart
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.pie(df['total'], labels=df['category'], autopct='%1.1f%%', startangle=90)
-        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-        
-        title = f'{transaction_type.capitalize()} Distribution by Category'
-        if start_date and end_date:
-            title += f" ({start_date} to {end_date})"
-        
-        ax.set_title(title)
-        
-        return fig
-    
+
+        with metrics.timer("chart.figure"):
+            chart = self.figure(f"pie_{transaction_type}", (10, 6))
+            ax = chart.ax
+            if chart.rebuild(len(df)):
+                chart.artists = ax.pie(df['total'], labels=df['category'], autopct='%1.1f%%', startangle=90)
+                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+            else:
+                self.update_pie(chart.artists, df['total'].to_numpy(dtype=float), df['category'])
+
+            title = f'{transaction_type.capitalize()} Distribution by Category'
+            if start_date and end_date:
+                title += f" ({start_date} to {end_date})"
+
+            ax.set_title(title)
+
+        return chart.fig
+
+    @staticmethod
+    def update_pie(artists, totals, categories):
+        """Move the wedges and labels of a pie to new totals, laid out as Axes.pie(startangle=90) does"""
+        wedges, labels, percentages = artists
+        fractions = totals / totals.sum()
+        starts = 90 + 360 * np.concatenate([[0], np.cumsum(fractions)[:-1]])
+        for wedge, label, percentage, start, fraction, category in zip(
+                wedges, labels, percentages, starts, fractions, categories):
+            end = start + 360 * fraction
+            wedge.set_theta1(start)
+            wedge.set_theta2(end)
+            middle = np.radians((start + end) / 2)
+            x, y = np.cos(middle), np.sin(middle)
+            label.set_text(category)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            percentage.set_text(f'{fraction * 100:1.1f}%')
+            percentage.set_position((0.6 * x, 0.6 * y))
+
     def bar_chart_monthly_summary(self, year):
-        df = self.data_handler.get_monthly_summary(year)
-        
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_monthly_summary(year, projected=self.projected)
+
         if df.empty:
             return None
-        
-        # Create bar chart
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        months = df['month_name']
-        income = df['income']
-        expense = df['expense']
-        saving = df['saving']
-        
-        x = np.arange(len(months))
-        width = 0.25
-        
-        ax.bar(x - width, income, width, label='Income')
-        ax.bar(x, expense, width, label='Expense')
-        ax.bar(x + width, saving, width, label='Saving')
-        
-        ax.set_xticks(x)
-        ax.set_xticklabels(months, rotation=45)
-        ax.set_ylabel('Amount')
-        ax.set_title(f'Monthly Financial Summary - {year}')
-        ax.legend()
-        
-        plt.tight_layout()
-        
-        return fig
-    
-    def line_chart_balance_over_time(self, year):
-        df = self.data_handler.get_monthly_summary(year)
-        
+
+        with metrics.timer("chart.figure"):
+            chart = self.figure("monthly_summary", (12, 6))
+            ax = chart.ax
+
+            months = df['month_name']
+            series = [('Income', df['income']), ('Expense', df['expense']), ('Saving', df['saving'])]
+
+            x = np.arange(len(months))
+            width = 0.25
+
+            if chart.rebuild(len(months)):
+                chart.artists = [ax.bar(x + offset, values, width, label=label)
+                                 for offset, (label, values) in zip((-width, 0, width), series)]
+                ax.set_xticks(x)
+                ax.set_ylabel('Amount')
+                ax.legend()
+            else:
+                for bars, (_, values) in zip(chart.artists, series):
+                    for bar, value in zip(bars, values):
+                        bar.set_height(value)
+                ax.relim()
+                ax.autoscale_view()
+
+            ax.set_xticklabels(months, rotation=45)
+            ax.set_title(f'Monthly Financial Summary - {year}')
+
+        return chart.fig
+
+    def line_chart_balance_over_time(self, start_date=None, end_date=None, granularity=None):
+        """Running balance across the range (the whole ledger by default)"""
+        with metrics.timer("chart.query"):
+            if not (start_date and end_date):
+                first, last = self.data_handler.get_date_range()
+                if self.projected and last:
+                    # Run on through the year's projected occurrences
+                    last = max(last, f"{date.today().year}-12-31")
+                start_date, end_date = start_date or first, end_date or last
+            if not (start_date and end_date):
+                return None
+            granularity = granularity or pick_granularity(start_date, end_date)
+            df = self.data_handler.get_time_series(start_date, end_date, granularity, projected=self.projected)
+
         if df.empty:
             return None
-        
-        # Calculate balance (income - expense)
-        df['balance'] = df['income'] - df['expense']
-        
-        # Create line chart
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        ax.plot(df['month_name'], df['balance'], marker='o', linestyle='-')
-        
-        ax.set_xlabel('Month')
-        ax.set_ylabel('Balance (Income - Expense)')
-        ax.set_title(f'Balance Over Time - {year}')
-        ax.grid(True)
-        
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        return fig
-    
+
+        with metrics.timer("chart.figure"):
+            chart = self.figure("balance_over_time", (12, 6))
+            ax = chart.ax
+
+            periods = df['period'].astype('datetime64[ns]')
+            marker = 'o' if len(df) <= 40 else 'None'
+            # One line of any length, so only the first render creates it
+            if chart.rebuild("line"):
+                chart.artists, = ax.plot(periods, df['balance'], marker=marker, linestyle='-')
+                ax.axhline(0, color='gray', linewidth=0.8)
+                ax.set_ylabel('Running Balance (Income - Expense)')
+                ax.grid(True)
+            else:
+                chart.artists.set_data(periods, df['balance'])
+                chart.artists.set_marker(marker)
+            # Rescale on both paths so the same data always gets the same limits
+            ax.relim()
+            ax.autoscale_view()
+
+            ax.set_xlabel(granularity.capitalize())
+            ax.set_title(f'Balance Over Time - {start_date[:10]} to {end_date[:10]}')
+            chart.fig.autofmt_xdate()
+
+        return chart.fig
+
     def stacked_area_chart(self, year):
-        df = self.data_handler.get_monthly_summary(year)
-        
+        with metrics.timer("chart.query"):
+            df = self.data_handler.get_monthly_summary(year, projected=self.projected)
+
         if df.empty:
             return None
-        
-        # Create stacked area chart
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        months = df['month_name']
-        
-        ax.stackplot(months, df['income'], df['expense'], df['saving'], 
-                    labels=['Income', 'Expense', 'Saving'],
-                    alpha=0.8)
-        
-        ax.set_xlabel('Month')
-        ax.set_ylabel('Amount')
-        ax.set_title(f'Financial Flow - {year}')
-        ax.legend(loc='upper left')
-        
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        return fig
-        
-    def fig_to_surface(self, fig):
-        """Convert a matplotlib figure to a pygame surface"""
-        # Create a canvas and render the figure
-        canvas = FigureCanvasAgg(fig)
-        canvas.draw()
 
-        # Get the RGBA buffer from the figure
-        buf = canvas.buffer_rgba()
+        with metrics.timer("chart.figure"):
+            chart = self.figure("financial_flow", (12, 6))
+            ax = chart.ax
+
+            months = df['month_name']
+            x = np.arange(len(months))
+            layers = [df['income'], df['expense'], df['saving']]
 
-        # Get the dimensions of the figure
-        width, height = fig.canvas.get_width_height()
+            if chart.rebuild(len(months)):
+                chart.artists = ax.stackplot(x, *layers, labels=['Income', 'Expense', 'Saving'], alpha=0.8)
+                ax.set_xticks(x)
+                ax.set_xlabel('Month')
+                ax.set_ylabel('Amount')
+                ax.legend(loc='upper left')
+            else:
+                tops = np.cumsum(layers, axis=0)
+                bottoms = np.vstack([np.zeros(len(x)), tops[:-1]])
+                outline_x = np.concatenate([x, x[::-1]])
+                for area, top, bottom in zip(chart.artists, tops, bottoms):
+                    area.set_verts([np.column_stack([outline_x, np.concatenate([top, bottom[::-1]])])])
+                # relim() skips collections, so feed their extent in by hand
+                ax.relim()
+                ax.update_datalim(np.column_stack([np.concatenate([x, x]),
+                                                   np.concatenate([np.zeros(len(x)), tops[-1]])]))
+                ax.autoscale_view()
+
+            ax.set_xticklabels(months, rotation=45)
+            ax.set_title(f'Financial Flow - {year}')
+
+        return chart.fig
+
+    @staticmethod
+    def draw(fig):
+        """Render a figure on its Agg canvas, which keeps one RGBA buffer across draws"""
+        canvas = fig.canvas if isinstance(fig.canvas, FigureCanvasAgg) else FigureCanvasAgg(fig)
+        canvas.draw()
+        return canvas
 
-        # Convert the buffer to a Pygame surface
-        surf = pygame.image.frombuffer(buf, (width, height), "RGBA")
-        
-        plt.close(fig)  # Close the figure to free memory
-        
-        return surf
\ No newline at end of file
+    @metrics.timed("chart.rasterize")
+    def fig_to_rgba(self, fig):
+        """Rasterize a matplotlib figure to (RGBA bytes, (width, height))"""
+        canvas = self.draw(fig)
+        # Copy the RGBA buffer out so it can cross threads safely
+        return bytes(canvas.buffer_rgba()), canvas.get_width_height()
@@ -0,0 +1,183 @@
+import atexit
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+# A durability policy is "immediate" or a comma-separated list of limits,
+# e.g. "50ms", "100ops" or "50ms,100ops": pending writes are committed
+# as soon as any limit is reached
+DEFAULT_WRITE_POLICY = "50ms,256ops"
+POLICY_LIMIT = re.compile(r'^(\d+(?:\.\d+)?)(ms|ops)$')
+
+INSERT_TRANSACTION = '''
+    INSERT INTO transactions (date, amount, category, description, transaction_type)
+    VALUES (?, ?, ?, ?, ?)
+'''
+UPDATE_TRANSACTION = '''
+    UPDATE transactions SET date = ?, amount = ?, category = ?, description = ?, transaction_type = ?
+    WHERE id = ?
+'''
+DELETE_TRANSACTION = '''
+    DELETE FROM transactions WHERE id = ?
+    RETURNING id, date, amount, category, description, transaction_type
+'''
+
+
+def parse_policy(policy):
+    """(max_delay_ms, max_ops, wait) for a durability policy string"""
+    if policy == "immediate":
+        return 0.0, 1, True
+    max_delay_ms = max_ops = None
+    for limit in policy.split(","):
+        match = POLICY_LIMIT.match(limit.strip())
+        if not match:
+            raise ValueError(f"Invalid write policy {policy!r}: expected 'immediate' or limits like '50ms,100ops'")
+        value, unit = match.groups()
+        if unit == "ms":
+            max_delay_ms = float(value)
+        else:
+            max_ops = max(1, int(float(value)))
+    return max_delay_ms, max_ops, False
+
+
+class WriteJournal:
+    """Apply transaction inserts and deletes on a writer thread in group commits.
+
+    Callers queue a write and get a Future back straight away; the writer
+    runs everything queued so far in one transaction once the policy's
+    delay or op count is reached, or when flush() asks for it. With the
+    "immediate" policy every write waits for its own commit, as plain
+    commits did. Pending writes are flushed by close() and, failing that,
+    at interpreter exit.
+    """
+
+    def __init__(self, connections, policy=DEFAULT_WRITE_POLICY, on_commit=None):
+        self.connections = connections
+        self.policy = policy
+        self.max_delay_ms, self.max_ops, self.wait = parse_policy(policy)
+        # Called on the writer thread with the number of writes in each commit
+        self.on_commit = on_commit
+        self.condition = threading.Condition()
+        self.pending = []
+        self.oldest_ms = None
+        self.queued_seq = 0
+        self.applied_seq = 0
+        self.flush_requested = False
+        self.stopped = False
+        self.writer = threading.Thread(target=self.run, name="write-journal", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def insert(self, date, amount, category, description, transaction_type):
+        """Queue an insert; the Future resolves to the new row's id"""
+        return self.submit(INSERT_TRANSACTION, (date, amount, category, description, transaction_type))
+
+    def update(self, transaction_id, date, amount, category, description, transaction_type):
+        """Queue an update; the Future resolves to the number of rows changed"""
+        return self.submit(UPDATE_TRANSACTION, (date, amount, category, description, transaction_type, transaction_id))
+
+    def delete(self, transaction_id):
+        """Queue a delete; the Future resolves to the deleted row as a tuple, or None"""
+        return self.submit(DELETE_TRANSACTION, (transaction_id,))
+
+    def submit(self, sql, params):
+        future = Future()
+        with self.condition:
+            if self.stopped:
+                raise RuntimeError("write journal is closed")
+            if not self.pending:
+                self.oldest_ms = time.monotonic() * 1000
+            self.pending.append((sql, params, future))
+            self.queued_seq += 1
+            self.condition.notify_all()
+        if self.wait:
+            future.result()
+        return future
+
+    def has_pending(self):
+        with self.condition:
+            return self.applied_seq < self.queued_seq
+
+    def flush(self):
+        """Commit everything queued so far and wait for it"""
+        with self.condition:
+            target = self.queued_seq
+            if self.applied_seq >= target:
+                return
+            self.flush_requested = True
+            self.condition.notify_all()
+            while self.applied_seq < target and self.writer.is_alive():
+                self.condition.wait()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        atexit.unregister(self.close)
+        with self.condition:
+            if self.stopped:
+                return
+            self.stopped = True
+            self.condition.notify_all()
+        self.writer.join()
+
+    def due_in_ms(self):
+        """Milliseconds until the pending batch must be committed; 0 when it is due now"""
+        if self.flush_requested or self.stopped:
+            return 0
+        if self.max_ops is not None and len(self.pending) >= self.max_ops:
+            return 0
+        if self.max_delay_ms is None:
+            return None
+        return max(0.0, self.oldest_ms + self.max_delay_ms - time.monotonic() * 1000)
+
+    def run(self):
+        try:
+            while True:
+                with self.condition:
+                    while not self.pending and not self.stopped:
+                        self.condition.wait()
+                    if not self.pending:
+                        return
+                    # Let more writes join the batch until the policy says commit
+                    while (due := self.due_in_ms()) != 0:
+                        self.condition.wait(None if due is None else due / 1000)
+                    batch, self.pending = self.pending, []
+                    self.flush_requested = False
+                self.apply(batch)
+                with self.condition:
+                    self.applied_seq += len(batch)
+                    self.condition.notify_all()
+                if self.on_commit:
+                    self.on_commit(len(batch))
+        finally:
+            self.connections.release()
+
+    def apply(self, batch):
+        conn = self.connections.connection()
+        results = []
+        try:
+            with conn:
+                for sql, params, future in batch:
+                    try:
+                        cursor = conn.execute(sql, params)
+                        if sql is INSERT_TRANSACTION:
+                            result = cursor.lastrowid
+                        elif sql is DELETE_TRANSACTION:
+                            result = cursor.fetchone()
+                        else:
+                            result = cursor.rowcount
+                        results.append((future, result, None))
+                    except Exception as e:
+                        # One bad write fails alone; the rest of the batch still commits
+                        results.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed and was rolled back, so nothing in the batch was written
+            results = [(future, None, e) for _, _, future in batch]
+        # Done-callbacks run here, so they see every write in the batch
+        # before flush() returns to anyone waiting on it
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                print(f"Write failed: {error}")
+                future.set_exception(error)